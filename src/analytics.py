@@ -0,0 +1,299 @@
+# External imports
+import os
+import json
+import datetime
+import numpy as np
+import pandas as pd
+
+#===============================================================================
+# Global module variables
+#===============================================================================
+
+# Trading days per year for annualizing
+PERIODS = 252
+
+#===============================================================================
+# Non class functions for performance analytics
+#===============================================================================
+
+def capital_matrix(results, value='Capital'):
+	'''
+	Turns the tidy result of sweep.sweep into a dates x runs matrix, with
+	one column per combination of parameters.
+
+	Args:
+		results (pd.DataFrame): tidy frame with parameter columns, Date and
+			value
+		value (string): column containing the capital
+
+	Returns:
+		pd.DataFrame with dates as index and the parameters as columns
+	'''
+	params = [name for name in results.columns if name not in ('Date', value)]
+	return results.set_index(params + ['Date'])[value].unstack(params)
+
+
+def metrics(capital, initial=None, transactions=None, periods=PERIODS):
+	'''
+	Computes performance metrics of many runs at once. All metrics are
+	reductions along the date axis of the capital matrix.
+
+	Args:
+		capital (pd.DataFrame): capital by date (rows) and run (columns), e.g.
+			the result of a Simulator or MultiSimulator, the capital of a
+			MonteCarloSimulator or the result of capital_matrix
+		initial (float or np.array): starting capital of the runs. If None,
+			the first row is used as starting capital.
+		transactions (list): transactions of the runs in column order, as
+			returned by Depot.transactions. Turnover, fee and tax drag are
+			only computed if given.
+		periods (integer): number of rows per year
+
+	Returns:
+		pd.DataFrame with one row per run containing the total and annual
+		return, volatility, Sharpe and Sortino ratio, maximum drawdown and
+		its duration in rows, hit rate (share of rows with a gain of all
+		rows with a change) and if transactions are given turnover (traded
+		value per year relative to the mean capital), fee and tax drag
+		(paid fees and taxes relative to the starting capital)
+	'''
+	values = np.asarray(capital, dtype='float64')
+	if values.ndim == 1:
+		values = values[:, None]
+	if initial is None:
+		initial, values = values[0], values[1:]
+	initial = np.broadcast_to(np.asarray(initial, dtype='float64'),
+							values.shape[1:])
+	# Returns of every row relative to the previous one
+	previous = np.vstack([initial, values[:-1]])
+	returns = values / previous - 1.0
+	years = len(values) / float(periods)
+	with np.errstate(invalid='ignore', divide='ignore'):
+		total = values[-1] / initial - 1.0
+		mean = returns.mean(axis=0)
+		std = returns.std(axis=0, ddof=1)
+		downside = np.sqrt((np.minimum(returns, 0.0) ** 2).mean(axis=0))
+		result = {'total_return': total,
+				'annual_return': (1.0 + total) ** (1.0 / years) - 1.0,
+				'volatility': std * np.sqrt(periods),
+				'sharpe': mean / std * np.sqrt(periods),
+				'sortino': mean / downside * np.sqrt(periods)}
+		# Drawdown relative to the highest capital reached before
+		peak = np.maximum.accumulate(np.vstack([initial, values]),
+									axis=0)[1:]
+		drawdown = 1.0 - values / peak
+		result['max_drawdown'] = drawdown.max(axis=0)
+		# Rows since the last peak, the starting capital is row -1
+		rows = np.arange(len(values))[:, None]
+		last_peak = np.maximum.accumulate(
+						np.where(drawdown <= 0.0, rows, -1), axis=0)
+		result['drawdown_duration'] = (rows - last_peak).max(axis=0)
+		result['hit_rate'] = (returns > 0).sum(axis=0) \
+							/ (returns != 0).sum(axis=0)
+	if transactions is not None:
+		result.update(trade_metrics(transactions, initial,
+									values.mean(axis=0), years))
+	index = capital.columns if isinstance(capital, pd.DataFrame) else None
+	return pd.DataFrame(result, index=index)
+
+
+def trade_metrics(transactions, initial, mean_capital, years):
+	'''
+	Computes turnover, fee and tax drag of many runs at once from their
+	transactions, see metrics.
+
+	Returns:
+		dict of np.arrays with one value per run
+	'''
+	n = len(transactions)
+	# Stack the transactions of all runs and reduce per run
+	run = np.repeat(np.arange(n), [len(frame) for frame in transactions])
+	frames = [frame for frame in transactions if len(frame)]
+	if frames:
+		stacked = pd.concat(frames, ignore_index=True)
+	else:
+		stacked = pd.DataFrame(columns=['Quantity', 'Price', 'Fee', 'Tax'])
+	traded = np.bincount(run, stacked['Quantity'].values.astype('float64')
+						* stacked['Price'].values.astype('float64'),
+						minlength=n)
+	fees = np.bincount(run, stacked['Fee'].values.astype('float64'),
+						minlength=n)
+	taxes = np.bincount(run, stacked['Tax'].values.astype('float64'),
+						minlength=n)
+	return {'turnover': traded / mean_capital / years,
+			'fee_drag': fees / initial,
+			'tax_drag': taxes / initial}
+
+
+def storable(name, values):
+	'''
+	Converts a column of Python objects to an array np.save can write
+	without pickle. Columns of strings become unicode arrays, columns of
+	dates and missing values (None, NaT), e.g. the default start_time of a
+	sweep, become datetime64 arrays with NaT for missing values. Other
+	columns of objects, including strings mixed with missing values, raise
+	a TypeError, they would not be read back as stored.
+
+	Args:
+		name (string): name of the column, for the error message
+		values (np.array): values of the column
+
+	Returns:
+		np.array of a numeric, unicode or datetime64 dtype
+	'''
+	if values.dtype != object:
+		return values
+	missing = pd.isnull(values)
+	present = values[~missing]
+	if not missing.any() and all(isinstance(value, str) for value in present):
+		return values.astype('U')
+	if all(isinstance(value, (datetime.date, np.datetime64))
+			for value in present):
+		return np.asarray(pd.to_datetime(values), dtype='datetime64[ns]')
+	raise TypeError('Column {} contains objects that can not be stored, only '
+					'strings or dates and missing values are supported'
+					.format(name))
+
+
+def matches(stored, value):
+	'''
+	Returns the rows of a stored column equal to value or, if value is a
+	list, equal to one of its values, see ResultStore.read.
+	'''
+	values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+	mask = np.zeros(len(stored), dtype='bool')
+	for value in values:
+		if value is None or (np.ndim(value) == 0 and pd.isnull(value)):
+			mask |= pd.isnull(stored)
+		elif stored.dtype.kind == 'M':
+			mask |= stored == np.datetime64(pd.to_datetime(value))
+		else:
+			mask |= stored == value
+	return mask
+
+#===============================================================================
+# Class for storing results
+#===============================================================================
+
+class ResultStore:
+	'''
+	Appendable columnar store of result frames, e.g. capital series of
+	sweeps or metrics of runs. Every append writes a new part directory with
+	one .npy file per column, so appending never rewrites stored data.
+	Reading loads the filter columns first and only the selected rows of the
+	others, which are memory mapped.
+
+	Layout:
+		<path>/meta.json              parts and their columns
+		<path>/<part>/<column>.npy    values of a column of one part
+	'''
+
+	def __init__(self, path):
+		'''
+		Constructor of the ResultStore class, opens or creates the store.
+
+		Args:
+			path (string): directory of the store
+		'''
+		self.path = path
+		os.makedirs(path, exist_ok=True)
+		meta = os.path.join(path, 'meta.json')
+		if os.path.exists(meta):
+			with open(meta) as f:
+				self.parts = json.load(f)['parts']
+		else:
+			self.parts = []
+
+
+	def __len__(self):
+		return sum(part['rows'] for part in self.parts)
+
+
+	@property
+	def columns(self):
+		'''
+		Names of all stored columns in order of first appearance.
+		'''
+		columns = []
+		for part in self.parts:
+			columns += [name for name in part['columns']
+						if name not in columns]
+		return columns
+
+
+	def append(self, results, **tags):
+		'''
+		Appends a result frame as new part. Unless it is a range, the index
+		is stored as columns.
+
+		Args:
+			results (pd.DataFrame): frame to store
+			tags: constant columns added to all rows, e.g. version='1.2'.
+				Columns of Python objects are stored as described in
+				storable.
+
+		Returns:
+			integer number of the part, stored in column Part
+		'''
+		if isinstance(results.index, pd.RangeIndex):
+			frame = results.copy()
+		else:
+			frame = results.reset_index()
+		number = len(self.parts)
+		frame['Part'] = number
+		for name, value in tags.items():
+			frame[name] = value
+		# Convert all columns before writing, so that no partial part is left
+		arrays = {column: storable(column, np.asarray(frame[column]))
+					for column in frame.columns}
+		name = 'part_{:06d}'.format(number)
+		os.makedirs(os.path.join(self.path, name))
+		for column, values in arrays.items():
+			np.save(os.path.join(self.path, name, '{}.npy'.format(column)),
+					values)
+		self.parts.append({'name': name, 'rows': len(frame),
+							'columns': [str(column) for column in frame]})
+		# Meta data last, it marks the part as complete
+		tmp_path = os.path.join(self.path, 'meta.json.tmp')
+		with open(tmp_path, 'w') as f:
+			json.dump({'parts': self.parts}, f)
+		os.replace(tmp_path, os.path.join(self.path, 'meta.json'))
+		return number
+
+
+	def read(self, columns=None, **where):
+		'''
+		Reads stored rows.
+
+		Args:
+			columns (list): columns to read, all if None
+			where: filters by column, a value selects rows equal to it, a
+				list rows equal to one of its values, e.g. t_len=[1, 5].
+				None and NaT select missing dates.
+
+		Returns:
+			pd.DataFrame of the selected rows of all parts
+		'''
+		columns = self.columns if columns is None else list(columns)
+		frames = []
+		for part in self.parts:
+			directory = os.path.join(self.path, part['name'])
+			# Rows of the part passing all filters
+			mask = np.ones(part['rows'], dtype='bool')
+			for name, value in where.items():
+				if name not in part['columns']:
+					mask[:] = False
+					break
+				stored = np.load(os.path.join(directory, name + '.npy'),
+								mmap_mode='r')
+				mask &= matches(stored, value)
+			if not mask.any():
+				continue
+			rows = np.flatnonzero(mask)
+			frames.append(pd.DataFrame({
+					name: np.load(os.path.join(directory, name + '.npy'),
+								mmap_mode='r')[rows]
+					for name in columns if name in part['columns']}))
+		if not frames:
+			return pd.DataFrame(columns=columns)
+		return pd.concat(frames, ignore_index=True).reindex(columns=columns)
@@ -0,0 +1,151 @@
+# External imports
+import numpy as np
+import pandas as pd
+# Local imports
+import depot as dp
+import features as ft
+import universe as un
+
+#===============================================================================
+# Class for price matrices
+#===============================================================================
+
+class PriceMatrices:
+	'''
+	Columns of a FinanceData panel as dates x symbols matrices. Matrices are
+	created on first access and memoized. Besides the price and feature
+	columns Prev_Close is available, the closing price of the previous
+	trading day of each stock on every day the stock is traded, and Traded,
+	the traded layer of universe.Universe.
+	'''
+
+	def __init__(self, finance_data):
+		'''
+		Constructor of the PriceMatrices class
+
+		Args:
+			finance_data (FinanceData): data the matrices are built from
+		'''
+		# Copy references to parameters to class variables
+		self.finance = finance_data
+		self.matrices = {}
+
+
+	def __getitem__(self, name):
+		'''
+		Returns the dates x symbols matrix of column name.
+
+		Args:
+			name (string): price column, feature, Prev_Close or Traded
+
+		Returns:
+			pd.DataFrame with sorted dates as index and symbols as columns
+		'''
+		if name not in self.matrices:
+			if name == 'Prev_Close':
+				# Close of the previous row of the same stock
+				shifter = ft.Shifter(self.finance.data)
+				column = pd.Series(shifter.unsort(shifter.column('Close', -1)),
+								index=self.finance.data.index)
+			elif name == 'Traded':
+				# Same stocks as universe.Universe, False on missing rows
+				close = self['Close']
+				self.matrices[name] = self.finance.universe().matrix('traded')\
+						.reindex(index=close.index, columns=close.columns,
+								fill_value=False)
+				return self.matrices[name]
+			else:
+				column = self.finance.feature(name)
+			self.matrices[name] = column.unstack('Symbol').sort_index()
+		return self.matrices[name]
+
+#===============================================================================
+# Class for simulating strategies on weight matrices
+#===============================================================================
+
+class VectorSimulator:
+	'''
+	Simulator for strategies that buy at the closing price of the previous
+	day and sell at the opening price of the current day. Instead of calling
+	the strategy once per day it asks for a dates x symbols matrix of weights
+	once and computes fills, fees, taxes and capital with array operations.
+	The same rules as in Depot.buy and Depot.sell apply.
+	'''
+
+	def __init__(self, finance_data, depot, strategy, start_time=None,
+				end_time=None):
+		'''
+		Constructor of the VectorSimulator class
+
+		Args:
+			finance_data (FinanceData): data on which the simulation is run
+			depot (Depot object): contains the starting capital and fees. Its
+				capital is updated at the end of the run.
+			strategy (function): called as strategy(prices, **kwargs) with
+				prices a PriceMatrices object. Features listed in its
+				attribute features are computed before the simulation.
+				Returns a dates x symbols
+				pd.DataFrame with the share of the capital at the start of
+				each day invested in each stock. Rows summing to more than
+				one are scaled down.
+			start_time (pd.Timestamp): first day of the simulation
+			end_time (pd.Timestamp): last day of the simulation, the last
+				day of the data if None
+		'''
+		# Copy references to parameters to class variables
+		self.finance = finance_data
+		self.depot = depot
+		self.strategy = strategy
+		# Compute the features read by the strategy
+		self.finance.require(getattr(self.strategy, 'features', []))
+		self.prices = finance_data.matrices()
+		# Dates of the simulation
+		self.dates = self.prices['Close'].index
+		if start_time is not None:
+			self.dates = self.dates[self.dates >= pd.to_datetime(start_time)]
+		if end_time is not None:
+			self.dates = self.dates[self.dates <= pd.to_datetime(end_time)]
+		self.start_time = min(self.dates)
+		# Create the simulation result object
+		self.result = pd.DataFrame(index=self.dates)
+		self.result['capital'] = np.nan
+
+
+	def run(self, **kwargs):
+		'''
+		Function to run the simulation of a strategy
+		'''
+		# Weights of the strategy aligned to the price matrices
+		weights = self.strategy(prices=self.prices, **kwargs)\
+				.reindex(index=self.dates, columns=self.prices['Close'].columns)
+		weights = weights.fillna(0.0).clip(lower=0.0).values
+		total = weights.sum(axis=1, keepdims=True)
+		weights = weights / np.maximum(total, 1.0)
+		# Buy and sell prices, stocks are only traded on days of the traded
+		# layer of the universe with both prices
+		buy = self.prices['Prev_Close'].reindex(self.dates).values
+		sell = self.prices['Open'].reindex(self.dates).values
+		traded = self.prices['Traded'].reindex(self.dates).values
+		tradable = traded & np.isfinite(buy) & np.isfinite(sell) \
+					& (weights > 0)
+		buy = np.where(tradable, buy, 1.0)
+		sell = np.where(tradable, sell, 1.0)
+		# Gain and tax per stock only depend on the prices
+		gain = sell - buy
+		taxes = np.maximum(0.0, dp.TAX * gain)
+		fees = self.depot.fees
+		capital = np.empty(len(self.dates))
+		current = self.depot.capital
+		for i in range(len(self.dates)):
+			# Maximum quantity affordable with the share of the capital
+			quant = np.floor((weights[i] * current - fees) / buy[i])
+			quant = np.where(tradable[i] & (quant > 0), quant, 0.0)
+			# Buy at previous close, sell at open, pay fees twice and taxes
+			current += np.dot(quant, gain[i] - taxes[i]) \
+						- 2 * fees * np.count_nonzero(quant)
+			capital[i] = current
+		# Save the time development of the capital
+		self.result['capital'] = capital
+		self.depot.capital = current
+		# For convenience return the result object
+		return self.result
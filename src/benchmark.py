@@ -0,0 +1,236 @@
+# External imports
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import subprocess
+import time
+import numpy as np
+import pandas as pd
+# Local imports
+import depot as dp
+import financedata as fd
+import providers as pv
+import simulator as sim
+import strategies as strat
+
+#===============================================================================
+# Global module variables
+#===============================================================================
+
+# Default scaling axes, number of stocks and years of data
+SYMBOLS = [10, 100, 1000]
+YEARS = [1, 5]
+
+# Last day of the generated data, fixed for reproducible results
+END = pd.to_datetime('2019-12-31')
+
+# Strategies simulated by name, with their keyword arguments
+STRATEGIES = {'no_trade': (strat.no_trade, {}),
+			'inter_day_even': (strat.inter_day_even, {}),
+			'inter_day_random': (strat.inter_day_random, {}),
+			'inter_day_greedy': (strat.inter_day_greedy, {'t_len': 5})}
+
+# Starting parameters of the simulated depots
+CAPITAL = 10000.0
+FEES = 5.0
+
+#===============================================================================
+# Functions for timing
+#===============================================================================
+
+def timed(function, repeat=1):
+	'''
+	Calls function repeat times and returns the shortest duration in seconds
+	together with the result of the last call.
+	'''
+	best = None
+	for _ in range(repeat):
+		start = time.perf_counter()
+		result = function()
+		duration = time.perf_counter() - start
+		best = duration if best is None else min(best, duration)
+	return best, result
+
+
+def record(name, seconds, count, **axes):
+	'''
+	Returns the result of one benchmark as dict.
+
+	Args:
+		name (string): name of the benchmark
+		seconds (float): duration of the benchmark
+		count (integer): number of processed items, e.g. rows or orders
+		axes: values of the scaling axes
+	'''
+	result = {'benchmark': name}
+	result.update(axes)
+	result.update({'count': int(count), 'seconds': seconds,
+					'per_second': count / seconds if seconds > 0 else None})
+	return result
+
+
+def environment():
+	'''
+	Returns the versions of the code and the libraries the benchmarks were
+	run with.
+	'''
+	try:
+		commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+										stderr=subprocess.DEVNULL)\
+							.decode('ascii').strip()
+	except (OSError, subprocess.CalledProcessError):
+		commit = None
+	return {'commit': commit,
+			'time': pd.Timestamp.now().isoformat(),
+			'python': platform.python_version(),
+			'numpy': np.__version__,
+			'pandas': pd.__version__,
+			'machine': platform.machine(),
+			'system': platform.system()}
+
+#===============================================================================
+# Benchmarks
+#===============================================================================
+
+def synthetic_data(n_symbols, n_years, seed=0, missing=0.01, gaps=0.1):
+	'''
+	Loads a synthetic universe, see providers.SyntheticProvider.
+
+	Args:
+		n_symbols (integer): number of stocks
+		n_years (integer): number of years of data, ending at END
+		seed (integer): seed of the generated prices
+		missing (float): probability of a stock missing a day
+		gaps (float): probability of listing gaps of a stock
+
+	Returns:
+		FinanceData object
+	'''
+	provider = pv.SyntheticProvider(seed=seed, missing=missing, gaps=gaps)
+	# Loading messages of thousands of stocks are not of interest here
+	with contextlib.redirect_stdout(io.StringIO()):
+		return fd.FinanceData(name_list=provider.symbols(n_symbols),
+							start_date=END - pd.DateOffset(years=n_years),
+							end_date=END, provider=provider)
+
+
+def bench_data(n_symbols, n_years, strategies, repeat=1, seed=0):
+	'''
+	Times loading, enriching and simulating on one synthetic universe.
+
+	Returns:
+		list of results, see record
+	'''
+	axes = {'symbols': n_symbols, 'years': n_years}
+	results = []
+	seconds, finance = timed(lambda: synthetic_data(n_symbols, n_years,
+													seed), repeat)
+	rows = len(finance.data)
+	results.append(record('load_data', seconds, rows, **axes))
+	# Features are computed from scratch in every repetition
+	def enrich():
+		finance.invalidate()
+		finance.enrich_data()
+	seconds, _ = timed(enrich, repeat)
+	results.append(record('enrich_data', seconds, rows, **axes))
+	for name in strategies:
+		strategy, kwargs = STRATEGIES[name]
+		# Every repetition starts with a new depot and strategy state
+		def simulate():
+			random.seed(seed)
+			simulator = sim.Simulator(finance, dp.Depot(CAPITAL, FEES),
+									strategy)
+			start = time.perf_counter()
+			simulator.run(**kwargs)
+			return time.perf_counter() - start
+		durations = [simulate() for _ in range(repeat)]
+		results.append(record('Simulator.run.' + name, min(durations), rows,
+							**axes))
+	return results
+
+
+def bench_depot(n_symbols, n_orders=100000, repeat=1):
+	'''
+	Times buying and selling n_orders times, spread over n_symbols stocks.
+
+	Returns:
+		list of results, see record
+	'''
+	symbols = pv.SyntheticProvider.symbols(n_symbols)
+	stocks = [symbols[i % n_symbols] for i in range(n_orders)]
+	prices = np.random.RandomState(0).uniform(10, 100, n_orders)
+	results = []
+	buy_times, sell_times = [], []
+	for _ in range(repeat):
+		depot = dp.Depot(capital=1e12, fees=FEES)
+		start = time.perf_counter()
+		for stock, price in zip(stocks, prices):
+			depot.buy(stock, price, 10)
+		buy_times.append(time.perf_counter() - start)
+		start = time.perf_counter()
+		for stock, price in zip(stocks, prices):
+			depot.sell(stock, price, 10)
+		sell_times.append(time.perf_counter() - start)
+	results.append(record('Depot.buy', min(buy_times), n_orders,
+						symbols=n_symbols))
+	results.append(record('Depot.sell', min(sell_times), n_orders,
+						symbols=n_symbols))
+	return results
+
+
+def run(symbols=SYMBOLS, years=YEARS, strategies=list(STRATEGIES),
+		n_orders=100000, repeat=1, seed=0, output=None):
+	'''
+	Runs all benchmarks over the scaling axes.
+
+	Args:
+		symbols (list): numbers of stocks
+		years (list): numbers of years of data
+		strategies (list): names of the simulated strategies, see STRATEGIES
+		n_orders (integer): number of orders of the depot benchmarks
+		repeat (integer): repetitions of every benchmark, the shortest
+			duration is reported
+		seed (integer): seed of the generated data
+		output (string): json file the results are written to
+
+	Returns:
+		pd.DataFrame with one row per benchmark
+	'''
+	results = []
+	for n_symbols in symbols:
+		for n_years in years:
+			print('... Benchmark: {} symbols, {} years'.format(n_symbols,
+																n_years))
+			results += bench_data(n_symbols, n_years, strategies, repeat,
+								seed)
+		results += bench_depot(n_symbols, n_orders, repeat)
+	# Keep the environment with the results to compare versions
+	if output is not None:
+		with open(output, 'w') as f:
+			json.dump({'environment': environment(), 'results': results}, f,
+					indent=1)
+	return pd.DataFrame(results)
+
+#===============================================================================
+# Command line interface
+#===============================================================================
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(
+				description='Benchmarks on synthetic data, e.g. '
+							'python benchmark.py --symbols 10 5000 '
+							'--years 1 20 --output bench.json')
+	parser.add_argument('--symbols', type=int, nargs='+', default=SYMBOLS)
+	parser.add_argument('--years', type=int, nargs='+', default=YEARS)
+	parser.add_argument('--strategies', nargs='+', default=list(STRATEGIES),
+						choices=list(STRATEGIES))
+	parser.add_argument('--orders', type=int, default=100000)
+	parser.add_argument('--repeat', type=int, default=1)
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('--output', default='benchmark.json')
+	args = parser.parse_args()
+	print(run(args.symbols, args.years, args.strategies, args.orders,
+			args.repeat, args.seed, args.output).to_string())
@@ -0,0 +1,178 @@
+# External imports
+import os
+import json
+import numpy as np
+import pandas as pd
+
+#===============================================================================
+# Global module variables
+#===============================================================================
+
+# Price columns stored for every symbol (one .npy file per column)
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Adj_Close']
+
+# One day, used to turn covered date ranges into missing date ranges
+DAY = pd.Timedelta(days=1)
+
+#===============================================================================
+# Class for the on-disk price cache
+#===============================================================================
+
+class PriceCache:
+	'''
+	Persistent columnar cache for raw daily OHLCV data.
+
+	Every symbol gets its own directory below path containing one .npy file
+	per column (dates are stored as datetime64[D]) and a meta.json file which
+	records the date range that has already been requested from the data
+	source. Files are opened memory mapped, so reading a symbol only touches
+	the pages of the requested date range.
+	'''
+
+	def __init__(self, path):
+		'''
+		Constructor of the PriceCache class
+
+		Args:
+			path (string): directory in which the cache is stored. It is
+				created if it does not exist.
+		'''
+		# Copy parameters to class variables
+		self.path = path
+		# Create the cache directory
+		os.makedirs(self.path, exist_ok=True)
+
+
+	def symbol_path(self, symbol, name=None):
+		'''
+		Returns the directory of a symbol or the path of a file within it.
+
+		Args:
+			symbol (string): identifier of the stock
+			name (string): file name within the symbol directory
+		'''
+		# Symbols like '^GDAXI' are valid directory names, only '/' is not
+		directory = os.path.join(self.path, symbol.replace('/', '_'))
+		if name is None:
+			return directory
+		return os.path.join(directory, name)
+
+
+	def coverage(self, symbol):
+		'''
+		Returns the date range already requested for symbol.
+
+		Args:
+			symbol (string): identifier of the stock
+
+		Returns:
+			tuple of pd.Timestamp (start, end) or None if symbol is not cached
+		'''
+		# Symbol was never written
+		meta_file = self.symbol_path(symbol, 'meta.json')
+		if not os.path.exists(meta_file):
+			return None
+		# Read the covered range
+		with open(meta_file) as f:
+			meta = json.load(f)
+		return pd.to_datetime(meta['start']), pd.to_datetime(meta['end'])
+
+
+	def missing(self, symbol, start_date, end_date):
+		'''
+		Determines the date ranges which still have to be fetched from the
+		data source to cover start_date to end_date.
+
+		Args:
+			symbol (string): identifier of the stock
+			start_date (pd.Timestamp): first day of the requested range
+			end_date (pd.Timestamp): last day of the requested range
+
+		Returns:
+			list of (start, end) tuples, empty if the cache covers the range
+		'''
+		# Nothing cached yet, so everything is missing
+		covered = self.coverage(symbol)
+		if covered is None:
+			return [(start_date, end_date)]
+		# Only the parts before and after the covered range are missing. They
+		# reach up to the covered range, even if the requested range does not,
+		# since the cache can only record a single covered range.
+		ranges = []
+		if start_date < covered[0]:
+			ranges.append((start_date, covered[0] - DAY))
+		if end_date > covered[1]:
+			ranges.append((covered[1] + DAY, end_date))
+		return ranges
+
+
+	def read(self, symbol, start_date, end_date):
+		'''
+		Reads the cached data of symbol between start_date and end_date.
+
+		Args:
+			symbol (string): identifier of the stock
+			start_date (pd.Timestamp): first day of the requested range
+			end_date (pd.Timestamp): last day of the requested range
+
+		Returns:
+			pd.DataFrame with columns Symbol, Date and COLUMNS sorted by
+			ascending date. Empty if nothing is cached for the range.
+		'''
+		# Return empty frame for unknown symbols
+		if self.coverage(symbol) is None:
+			return pd.DataFrame(columns=['Symbol', 'Date'] + COLUMNS)
+		# Memory map the dates and find the boundaries of the range
+		dates = np.load(self.symbol_path(symbol, 'Date.npy'), mmap_mode='r')
+		first = np.searchsorted(dates, np.datetime64(start_date, 'D'), 'left')
+		last = np.searchsorted(dates, np.datetime64(end_date, 'D'), 'right')
+		# Only the pages of the requested range are read from disk
+		data = pd.DataFrame({'Date': pd.to_datetime(
+								dates[first:last].astype('datetime64[ns]'))})
+		for column in COLUMNS:
+			values = np.load(self.symbol_path(symbol, column + '.npy'),
+							mmap_mode='r')
+			data[column] = np.array(values[first:last])
+		data.insert(0, 'Symbol', symbol)
+		return data
+
+
+	def write(self, symbol, data, start_date, end_date):
+		'''
+		Merges freshly fetched data of symbol into the cache and marks the
+		range start_date to end_date as covered.
+
+		Args:
+			symbol (string): identifier of the stock
+			data (pd.DataFrame): fetched data containing Date and COLUMNS
+			start_date (pd.Timestamp): first day of the fetched range
+			end_date (pd.Timestamp): last day of the fetched range
+		'''
+		# Never mark days as covered that the source could not know yet
+		end_date = min(end_date, pd.Timestamp.today().normalize() - DAY)
+		# Nothing of a range in the future can be covered yet
+		if end_date < start_date:
+			return
+		# Merge with the already cached data, new data wins on overlaps
+		covered = self.coverage(symbol)
+		if covered is not None:
+			cached = self.read(symbol, covered[0], covered[1])
+			data = pd.concat([cached, data], ignore_index=True)
+			start_date = min(start_date, covered[0])
+			end_date = max(end_date, covered[1])
+		data = data.drop_duplicates(subset='Date', keep='last')\
+				.sort_values('Date')
+		# Write every column to its own file
+		os.makedirs(self.symbol_path(symbol), exist_ok=True)
+		columns = {'Date': data['Date'].values.astype('datetime64[D]')}
+		for column in COLUMNS:
+			columns[column] = data[column].values.astype('float64')
+		for column, values in columns.items():
+			# Write to temporary file first so readers never see partial data
+			tmp_file = self.symbol_path(symbol, column + '.tmp.npy')
+			np.save(tmp_file, values)
+			os.replace(tmp_file, self.symbol_path(symbol, column + '.npy'))
+		# Record the covered range last, it marks the update as complete
+		with open(self.symbol_path(symbol, 'meta.json'), 'w') as f:
+			json.dump({'start': str(start_date.date()),
+						'end': str(end_date.date())}, f)
@@ -1,49 +1,237 @@
 # External imports
+import numpy as np
 import pandas as pd
 
 #===============================================================================
-# Class for depots 
+# Global module variables
+#===============================================================================
+
+# Tax rate on gains (Abgeltungssteuer und Solidarittszuschlag)
+TAX = 0.26375
+
+# Sides of transactions in the ledger
+BUY = 1
+SELL = -1
+
+# Record layout of a transaction in the ledger
+TRANSACTION = np.dtype([('Time', 'datetime64[ns]'), ('Symbol', 'int32'),
+						('Side', 'int8'), ('Quantity', 'float64'),
+						('Price', 'float64'), ('Fee', 'float64'),
+						('Tax', 'float64')])
+
+# Record layout of a transaction of an account of a DepotArray
+ACCOUNT_TRANSACTION = np.dtype(TRANSACTION.descr + [('Account', 'int32')])
+
+#===============================================================================
+# Class for transaction ledgers
+#===============================================================================
+
+class Ledger:
+	'''
+	Append-only record of transactions stored in a preallocated structured
+	array. The array doubles its size when full, so appending a transaction
+	does not allocate in the common case.
+	'''
+	__slots__ = ('records', 'size')
+
+	def __init__(self, capacity=1024, dtype=TRANSACTION):
+		'''
+		Constructor of the Ledger class
+
+		Args:
+			capacity (integer): number of transactions preallocated
+			dtype (np.dtype): record layout, TRANSACTION or
+				ACCOUNT_TRANSACTION
+		'''
+		self.records = np.zeros(capacity, dtype=dtype)
+		self.size = 0
+
+
+	def __len__(self):
+		return self.size
+
+
+	def __getstate__(self):
+		# Only the recorded transactions are pickled
+		return (self.records[:self.size].copy(),)
+
+
+	def __setstate__(self, state):
+		records, = state
+		self.size = len(records)
+		self.records = np.zeros(max(2 * self.size, 1024), dtype=records.dtype)
+		self.records[:self.size] = records
+
+
+	def append(self, time, symbol, side, quant, price, fee, tax):
+		'''
+		Records a transaction.
+
+		Args:
+			time (pd.Timestamp): time of the transaction, may be None
+			symbol (integer): slot of the stock in the depot
+			side (integer): BUY or SELL
+			quant (float): number of stocks
+			price (float): price of a single stock
+			fee (float): transaction fee paid
+			tax (float): taxes paid in total
+		'''
+		# Grow the preallocated array if it is full
+		if self.size == len(self.records):
+			self.reserve(1)
+		self.records[self.size] = (np.datetime64(time, 'ns'), symbol, side,
+									quant, price, fee, tax)
+		self.size += 1
+
+
+	def extend(self, n, **columns):
+		'''
+		Records n transactions at once.
+
+		Args:
+			n (integer): number of transactions
+			columns: values per field of the record layout, arrays of length
+				n or single values shared by all transactions, e.g.
+				Time=time, Symbol=slots, Side=BUY
+		'''
+		self.reserve(n)
+		records = self.records[self.size:self.size + n]
+		for name, values in columns.items():
+			if name == 'Time':
+				values = np.datetime64(values, 'ns')
+			records[name] = values
+		self.size += n
+
+
+	def reserve(self, n):
+		'''
+		Doubles the preallocated array until n more transactions fit.
+		'''
+		capacity = max(len(self.records), 1)
+		while capacity < self.size + n:
+			capacity *= 2
+		if capacity > len(self.records):
+			records = np.zeros(capacity, dtype=self.records.dtype)
+			records[:self.size] = self.records[:self.size]
+			self.records = records
+
+
+	def to_frame(self, symbols):
+		'''
+		Exports the transactions to a data frame.
+
+		Args:
+			symbols (list): names of the stocks by slot
+
+		Returns:
+			pd.DataFrame with one row per transaction
+		'''
+		records = self.records[:self.size]
+		transactions = pd.DataFrame({name: records[name]
+									for name in records.dtype.names})
+		# Replace slots by the names of the stocks
+		transactions['Symbol'] = np.array(symbols, dtype=object)[
+											records['Symbol']]
+		return transactions
+
+#===============================================================================
+# Class for depots
 #===============================================================================
 
 class Depot:
 	'''
 	Class for easy depot management. Contains buying and selling functions.
+
+	Stocks are mapped to integer slots, the owned quantities and average
+	purchase prices are kept in arrays indexed by slot. All transactions are
+	recorded in a Ledger.
 	'''
-	
-	def __init__(self, capital, fees, portfolio=None):
+	__slots__ = ('capital', 'fees', 'time', 'symbols', 'slots', 'quantity',
+				'price', 'ledger')
+
+	def __init__(self, capital, fees, portfolio=None, capacity=64):
 		'''
 		Constructor of the Depot class
-		
+
 		Args:
 			capital (float): starting capital
 			fees (float): transaction fees (applied to every buy and sell)
-			portfolio (pd.DataFrame): specifies the owned stocks
+			portfolio (pd.DataFrame): specifies the owned stocks, with columns
+				Quantity and Price indexed by stock
+			capacity (integer): number of stocks preallocated
 		'''
 		# Copy parameters to class variables
 		self.capital = capital
 		self.fees = fees
-		# Set portfolio if not set
-		if portfolio is None:
-			# Create empty portfolio
-			self.portfolio = pd.DataFrame(columns=['Quantity', 'Price'])
-		else:
-			# Reference the parameter to the class variable
-			self.portfolio = portfolio
+		# Time of the transactions, set by the simulator
+		self.time = None
+		# Mapping of stocks to slots of the arrays
+		self.symbols = []
+		self.slots = {}
+		self.quantity = np.zeros(capacity)
+		self.price = np.zeros(capacity)
+		self.ledger = Ledger()
+		# Take over the owned stocks
+		if portfolio is not None:
+			for stock in portfolio.index:
+				slot = self.slot(stock)
+				self.quantity[slot] = portfolio.loc[stock, 'Quantity']
+				self.price[slot] = portfolio.loc[stock, 'Price']
+
+
+	def slot(self, stock):
+		'''
+		Returns the slot of stock, a new one is assigned to unknown stocks.
+
+		Args:
+			stock (string): identifier of the stock
+		'''
+		slot = self.slots.get(stock)
+		if slot is None:
+			slot = len(self.symbols)
+			# Double the arrays if all slots are taken
+			if slot == len(self.quantity):
+				self.quantity = np.concatenate([self.quantity,
+												np.zeros(slot)])
+				self.price = np.concatenate([self.price, np.zeros(slot)])
+			self.slots[stock] = slot
+			self.symbols.append(stock)
+		return slot
+
+
+	@property
+	def portfolio(self):
+		'''
+		Owned stocks as pd.DataFrame with columns Quantity and Price indexed
+		by stock. Created on every access, changes are not written back.
+		'''
+		n = len(self.symbols)
+		owned = self.quantity[:n] > 0
+		return pd.DataFrame({'Quantity': self.quantity[:n][owned],
+							'Price': self.price[:n][owned]},
+							index=np.array(self.symbols, dtype=object)[owned],
+							columns=['Quantity', 'Price'])
+
+
+	def transactions(self):
+		'''
+		Returns all transactions of the depot as pd.DataFrame.
+		'''
+		return self.ledger.to_frame(self.symbols)
 
 
 	def monetize(self, prices):
 		'''
 		Sell all stocks remaining in the portfolio for the specified price.
-		
+
 		Args:
 			prices (pd.Series): Price per stock
 		'''
-		# If stocks are owned
-		if not self.portfolio.empty:
-			# Go through all of them
-			for stock in self.portfolio.index.levels[0]:
-				# Sell all
-				self.sell(stock, prices.loc[stock])
+		# Go through all owned stocks
+		for slot in np.flatnonzero(self.quantity[:len(self.symbols)] > 0):
+			# Sell all
+			stock = self.symbols[slot]
+			self.sell(stock, prices.loc[stock])
 
 
 	def buy(self, stock, price, quant=None):
@@ -53,7 +241,7 @@ class Depot:
 		deducted from self.capital for this transaction.
 		If capital is not sufficent for quant stocks, the maximum amount
 		possible is purchased.
-		
+
 		Args:
 			stock (string): identifier of the stock to purchase
 			price (float): price at which a single stock can be purchased
@@ -68,20 +256,14 @@ class Depot:
 		if quant <= 0: return
 		# Pay for stock and pay transaction fee
 		self.capital -= quant * price + self.fees
-		# Add stock to portfolio
-		if stock in self.portfolio.index:
-			# Create temporary variables
-			port_price = self.portfolio.loc[stock]['Price']
-			port_quant = self.portfolio.loc[stock]['Quantity']
-			# Update quantities and prices in portfolio
-			self.portfolio.loc[stock]['Quantity'] = port_quant + quant
-			self.portfolio.loc[stock]['Price'] = \
-				(quant * price + port_quant * port_price) / (port_quant + quant)
-		else:
-			# Create row in self.portfolio by appending dataframe
-			new_stocks = pd.DataFrame(data=[[price, quant]],
-									columns=['Price','Quantity'], index=[stock])
-			self.portfolio = self.portfolio.append(new_stocks)
+		# Add stock to portfolio, updating the average price
+		slot = self.slot(stock)
+		port_quant = self.quantity[slot]
+		self.price[slot] = \
+			(quant * price + port_quant * self.price[slot]) / (port_quant + quant)
+		self.quantity[slot] = port_quant + quant
+		# Record the transaction
+		self.ledger.append(self.time, slot, BUY, quant, price, self.fees, 0.0)
 
 
 	def sell(self, stock, price, quant=None):
@@ -90,7 +272,7 @@ class Depot:
 		while adding the amount to self.capital. Also self.fees are
 		deducted from self.capital for this transaction.
 		If less than quant stocks are owned all are sold.
-		
+
 		Args:
 			stock (string): identifier of the stock to sell
 			price (float): price at which a single stock can be sold
@@ -99,18 +281,319 @@ class Depot:
 				the current portfolio) is sold.
 		'''
 		# If stock is not owned, do not do anything
-		if stock not in self.portfolio.index: return
+		slot = self.slots.get(stock)
+		if slot is None or self.quantity[slot] <= 0: return
 		# Determine if the asked number of stocks is owned
-		if quant is None or quant > self.portfolio.loc[stock]['Quantity']:
-			quant = self.portfolio.loc[stock]['Quantity']
+		if quant is None or quant > self.quantity[slot]:
+			quant = self.quantity[slot]
 		# If invalid quant value, do not do anything
 		if quant <= 0: return
 		# Calculate taxes (Abgeltungssteuer und Solidarittszuschlag)
-		taxes = max(0.0, 0.26375 * (price - (self.portfolio.loc[stock]['Price'])))
+		taxes = max(0.0, TAX * (price - self.price[slot]))
 		# Add money to capital and pay transaction fees
 		self.capital += quant * price - self.fees - taxes * quant
 		# Remove stocks from portfolio
-		self.portfolio.loc[stock]['Quantity'] -= quant
-		# Delete row if all stocks were sold
-		if self.portfolio.loc[stock]['Quantity'] <= 0:
-			self.portfolio.drop(labels=stock, inplace=True)
\ No newline at end of file
+		self.quantity[slot] -= quant
+		# Reset the price if all stocks were sold
+		if self.quantity[slot] <= 0:
+			self.price[slot] = 0.0
+		# Record the transaction
+		self.ledger.append(self.time, slot, SELL, quant, price, self.fees,
+							taxes * quant)
+
+
+	def buy_many(self, stocks, prices, quants=None):
+		'''
+		Purchases several stocks at once, with the same result as calling
+		buy for every stock in order. Orders are applied in one vectorized
+		step as long as the capital suffices for all of them, orders after
+		the first one exceeding the capital are applied one by one.
+
+		Args:
+			stocks (list): identifiers of the stocks to purchase
+			prices (np.array): price of a single stock per order
+			quants (np.array): number of stocks per order, NaN for the
+				maximum amount. The maximum amount for all orders if None.
+		'''
+		prices = np.asarray(prices, dtype='float64')
+		if quants is None:
+			quants = np.full(len(prices), np.nan)
+		quants = np.asarray(quants, dtype='float64')
+		# Orders with invalid quant are not executed by buy
+		executed = ~(quants <= 0)
+		cost = np.where(executed, quants * prices + self.fees, 0.0)
+		# Orders covered by the capital, up to the first one that is not
+		covered = np.cumsum(cost) <= self.capital
+		n = len(prices) if covered.all() else int(np.argmin(covered))
+		if n:
+			slots = np.array([self.slot(stock) for stock in stocks[:n]],
+							dtype='int64')
+			slots, quant, price = slots[executed[:n]], \
+								quants[:n][executed[:n]], \
+								prices[:n][executed[:n]]
+			# Pay for stocks and transaction fees
+			self.capital -= cost[:n].sum()
+			# Add stocks to portfolio, updating the average prices
+			value = self.quantity * self.price
+			np.add.at(value, slots, quant * price)
+			np.add.at(self.quantity, slots, quant)
+			self.price[slots] = value[slots] / self.quantity[slots]
+			self.ledger.extend(len(slots), Time=self.time, Symbol=slots,
+								Side=BUY, Quantity=quant, Price=price,
+								Fee=self.fees, Tax=0.0)
+		# Remaining orders depend on the capital left by the previous ones
+		for i in range(n, len(prices)):
+			quant = None if np.isnan(quants[i]) else quants[i]
+			self.buy(stocks[i], prices[i], quant)
+
+
+	def sell_many(self, stocks, prices, quants=None):
+		'''
+		Sells several stocks at once, with the same result as calling sell
+		for every stock in order.
+
+		Args:
+			stocks (list): identifiers of the stocks to sell, each at most
+				once. Otherwise the orders are applied one by one.
+			prices (np.array): price of a single stock per order
+			quants (np.array): number of stocks per order, NaN for all owned
+				stocks. All owned stocks for all orders if None.
+		'''
+		prices = np.asarray(prices, dtype='float64')
+		if quants is None:
+			quants = np.full(len(prices), np.nan)
+		quants = np.asarray(quants, dtype='float64')
+		slots = np.array([self.slots.get(stock, -1) for stock in stocks],
+						dtype='int64')
+		if len(np.unique(slots[slots >= 0])) < (slots >= 0).sum():
+			for stock, price, quant in zip(stocks, prices, quants):
+				self.sell(stock, price, None if np.isnan(quant) else quant)
+			return
+		# Only owned stocks are sold, at most the owned quantity
+		owned = np.where(slots >= 0, self.quantity[slots], 0.0)
+		quants = np.where(np.isnan(quants) | (quants > owned), owned, quants)
+		executed = (owned > 0) & (quants > 0)
+		slots, quant, price = slots[executed], quants[executed], \
+							prices[executed]
+		# Calculate taxes (Abgeltungssteuer und Solidarittszuschlag)
+		taxes = np.maximum(0.0, TAX * (price - self.price[slots]))
+		# Add money to capital and pay transaction fees
+		self.capital += (quant * price - self.fees - taxes * quant).sum()
+		# Remove stocks from portfolio, resetting sold out prices
+		self.quantity[slots] -= quant
+		self.price[slots] = np.where(self.quantity[slots] <= 0, 0.0,
+									self.price[slots])
+		self.ledger.extend(len(slots), Time=self.time, Symbol=slots,
+							Side=SELL, Quantity=quant, Price=price,
+							Fee=self.fees, Tax=taxes * quant)
+
+#===============================================================================
+# Class for arrays of depots
+#===============================================================================
+
+class DepotArray:
+	'''
+	Many independent accounts trading the same stocks, e.g. with different
+	starting capital or fees. Capital and fees are arrays over the accounts,
+	quantities and average purchase prices are accounts x slots matrices.
+	Orders have the interface of Depot and are applied to all accounts in
+	one vectorized step, each account following the rules of Depot. A
+	strategy written for Depot, or using buy_many and sell_many, therefore
+	drives all accounts in one simulation.
+	'''
+	__slots__ = ('capital', 'fees', 'time', 'symbols', 'slots', 'quantity',
+				'price', 'ledger')
+
+	def __init__(self, capital, fees, capacity=64):
+		'''
+		Constructor of the DepotArray class
+
+		Args:
+			capital (np.array): starting capital per account
+			fees (np.array): transaction fees per account, a single value
+				for all accounts is broadcast
+			capacity (integer): number of stocks preallocated
+		'''
+		# Copy parameters to class variables
+		capital, fees = np.broadcast_arrays(np.asarray(capital, 'float64'),
+											np.asarray(fees, 'float64'))
+		self.capital = capital.ravel().copy()
+		self.fees = fees.ravel().copy()
+		# Time of the transactions, set by the simulator
+		self.time = None
+		# Mapping of stocks to slots of the arrays
+		self.symbols = []
+		self.slots = {}
+		self.quantity = np.zeros((len(self.capital), capacity))
+		self.price = np.zeros((len(self.capital), capacity))
+		self.ledger = Ledger(dtype=ACCOUNT_TRANSACTION)
+
+
+	def __len__(self):
+		return len(self.capital)
+
+
+	def slot(self, stock):
+		'''
+		Returns the slot of stock, a new one is assigned to unknown stocks.
+
+		Args:
+			stock (string): identifier of the stock
+		'''
+		slot = self.slots.get(stock)
+		if slot is None:
+			slot = len(self.symbols)
+			# Double the arrays if all slots are taken
+			if slot == self.quantity.shape[1]:
+				self.quantity = np.hstack([self.quantity,
+											np.zeros(self.quantity.shape)])
+				self.price = np.hstack([self.price, np.zeros(self.price.shape)])
+			self.slots[stock] = slot
+			self.symbols.append(stock)
+		return slot
+
+
+	@property
+	def portfolio(self):
+		'''
+		Owned stocks of all accounts as pd.DataFrame with columns Quantity
+		and Price indexed by account and stock.
+		'''
+		n = len(self.symbols)
+		accounts, slots = np.nonzero(self.quantity[:, :n] > 0)
+		index = pd.MultiIndex.from_arrays(
+					[accounts, np.array(self.symbols, dtype=object)[slots]],
+					names=['Account', 'Symbol'])
+		return pd.DataFrame({'Quantity': self.quantity[accounts, slots],
+							'Price': self.price[accounts, slots]},
+							index=index, columns=['Quantity', 'Price'])
+
+
+	def transactions(self):
+		'''
+		Returns all transactions of all accounts as pd.DataFrame.
+		'''
+		return self.ledger.to_frame(self.symbols)
+
+
+	def monetize(self, prices):
+		'''
+		Sell all stocks remaining in the portfolios for the specified price.
+
+		Args:
+			prices (pd.Series): Price per stock
+		'''
+		n = len(self.symbols)
+		for slot in np.flatnonzero((self.quantity[:, :n] > 0).any(axis=0)):
+			stock = self.symbols[slot]
+			self.sell(stock, prices.loc[stock])
+
+
+	def buy(self, stock, price, quant=None):
+		'''
+		Purchases quant stocks at price in every account, see Depot.buy.
+
+		Args:
+			stock (string): identifier of the stock to purchase
+			price (float): price at which a single stock can be purchased
+			quant (np.array): number of stocks to purchase per account, a
+				single value for all accounts or None (or NaN) for the
+				maximum amount
+		'''
+		quant = np.broadcast_to(np.asarray(np.nan if quant is None else quant,
+										dtype='float64'), self.capital.shape)
+		# Determine if capital is sufficient for quantity
+		insufficient = np.isnan(quant) | (self.capital < quant * price
+														+ self.fees)
+		quant = np.where(insufficient,
+						np.trunc((self.capital - self.fees) / price), quant)
+		# Only accounts with valid quant values buy
+		accounts = np.flatnonzero(quant > 0)
+		if not len(accounts):
+			return
+		quant = quant[accounts]
+		fees = self.fees[accounts]
+		# Pay for stock and pay transaction fee
+		self.capital[accounts] -= quant * price + fees
+		# Add stock to portfolios, updating the average prices
+		slot = self.slot(stock)
+		port_quant = self.quantity[accounts, slot]
+		self.price[accounts, slot] = (quant * price + port_quant
+									* self.price[accounts, slot]) \
+									/ (port_quant + quant)
+		self.quantity[accounts, slot] = port_quant + quant
+		self.ledger.extend(len(accounts), Time=self.time, Symbol=slot,
+							Side=BUY, Quantity=quant, Price=price, Fee=fees,
+							Tax=0.0, Account=accounts)
+
+
+	def sell(self, stock, price, quant=None):
+		'''
+		Sells quant stocks at price in every account, see Depot.sell.
+
+		Args:
+			stock (string): identifier of the stock to sell
+			price (float): price at which a single stock can be sold
+			quant (np.array): number of stocks to sell per account, a single
+				value for all accounts or None (or NaN) for all owned stocks
+		'''
+		slot = self.slots.get(stock)
+		if slot is None:
+			return
+		quant = np.broadcast_to(np.asarray(np.nan if quant is None else quant,
+										dtype='float64'), self.capital.shape)
+		# Determine if the asked number of stocks is owned
+		owned = self.quantity[:, slot]
+		quant = np.where(np.isnan(quant) | (quant > owned), owned, quant)
+		# Only accounts owning the stock sell
+		accounts = np.flatnonzero((owned > 0) & (quant > 0))
+		if not len(accounts):
+			return
+		quant = quant[accounts]
+		fees = self.fees[accounts]
+		# Calculate taxes (Abgeltungssteuer und Solidarittszuschlag)
+		taxes = np.maximum(0.0, TAX * (price - self.price[accounts, slot]))
+		# Add money to capital and pay transaction fees
+		self.capital[accounts] += quant * price - fees - taxes * quant
+		# Remove stocks from portfolios, resetting sold out prices
+		self.quantity[accounts, slot] -= quant
+		self.price[accounts, slot] = np.where(
+						self.quantity[accounts, slot] <= 0, 0.0,
+						self.price[accounts, slot])
+		self.ledger.extend(len(accounts), Time=self.time, Symbol=slot,
+							Side=SELL, Quantity=quant, Price=price, Fee=fees,
+							Tax=taxes * quant, Account=accounts)
+
+
+	def buy_many(self, stocks, prices, quants=None):
+		'''
+		Purchases several stocks in every account, see Depot.buy_many.
+
+		Args:
+			stocks (list): identifiers of the stocks to purchase
+			prices (np.array): price of a single stock per order
+			quants (np.array): number of stocks per order, or per account and
+				order, NaN for the maximum amount. The maximum amount for all
+				orders if None.
+		'''
+		quants = np.broadcast_to(np.nan if quants is None else quants,
+								(len(self), len(stocks)))
+		for i, (stock, price) in enumerate(zip(stocks, prices)):
+			self.buy(stock, price, quants[:, i])
+
+
+	def sell_many(self, stocks, prices, quants=None):
+		'''
+		Sells several stocks in every account, see Depot.sell_many.
+
+		Args:
+			stocks (list): identifiers of the stocks to sell
+			prices (np.array): price of a single stock per order
+			quants (np.array): number of stocks per order, or per account and
+				order, NaN for all owned stocks. All owned stocks for all
+				orders if None.
+		'''
+		quants = np.broadcast_to(np.nan if quants is None else quants,
+								(len(self), len(stocks)))
+		for i, (stock, price) in enumerate(zip(stocks, prices)):
+			self.sell(stock, price, quants[:, i])
@@ -0,0 +1,169 @@
+# External imports
+import numpy as np
+import pandas as pd
+from collections import OrderedDict, namedtuple
+
+#===============================================================================
+# Feature declarations
+#===============================================================================
+
+# Declaration of a price difference feature. The value at day t is
+#	(source(t + step) - base(t)) / (Close(t) if rel else 1)
+# taken lag trading days in the past. All shifts are per stock and count
+# trading days of that stock.
+Feature = namedtuple('Feature',
+					['name', 'source', 'base', 'step', 'lag', 'rel'])
+
+# Registry of all known features by name, in declaration order
+FEATURES = OrderedDict()
+
+
+def register(name, source, base, step=0, lag=0, rel=False):
+	'''
+	Declares a feature and adds it to the registry.
+
+	Args:
+		name (string): column name of the feature
+		source (string): column of the minuend
+		base (string): column of the subtrahend
+		step (integer): trading days the source is taken after base
+		lag (integer): trading days the difference is taken in the past
+		rel (boolean): if set to false, the absolute difference is returned,
+			else the difference relative to the closing price is returned.
+
+	Returns:
+		the declared Feature
+	'''
+	FEATURES[name] = Feature(name, source, base, step, lag, rel)
+	return FEATURES[name]
+
+
+def register_previous_day(lags):
+	'''
+	Declares the absolute and relative Previous_Day features for all lags.
+
+	Args:
+		lags (iterable): lags in trading days, e.g. range(1, 21)
+	'''
+	for i in lags:
+		register('Previous_Day_{}'.format(i), 'Open', 'Close', step=1, lag=i)
+		register('Previous_Day_Rel_{}'.format(i), 'Open', 'Close', step=1,
+				lag=i, rel=True)
+
+
+# Difference between opening and closing price
+register('Within_Day', 'Close', 'Open')
+register('Within_Day_Rel', 'Close', 'Open', rel=True)
+# Difference between closing price and opening price of the following day
+register('Between_Day', 'Open', 'Close', step=1)
+register('Between_Day_Rel', 'Open', 'Close', step=1, rel=True)
+# Between day difference i trading days in the past
+register_previous_day(range(1, 4))
+
+#===============================================================================
+# Vectorized computation
+#===============================================================================
+
+class Shifter:
+	'''
+	Shifts columns of a (Symbol, Date) panel by whole trading days within each
+	stock. The panel rows may be in any order, they are sorted once by symbol
+	and date and all shifts are plain array offsets in that order.
+	'''
+
+	def __init__(self, data):
+		'''
+		Constructor of the Shifter class
+
+		Args:
+			data (pd.DataFrame): panel with a (Symbol, Date) MultiIndex
+		'''
+		# Sort rows by symbol and ascending date
+		codes = data.index.codes[data.index.names.index('Symbol')]
+		dates = data.index.get_level_values('Date').values
+		self.order = np.lexsort((dates, codes))
+		self.codes = np.asarray(codes)[self.order]
+		self.data = data
+		# Sorted columns and shifted columns are computed only once
+		self.columns = {}
+
+
+	def column(self, name, step=0):
+		'''
+		Returns column name in sorted order, taken step trading days later.
+		Rows without such a day of the same stock are NaN.
+
+		Args:
+			name (string): column of the panel
+			step (integer): trading days to shift, negative for the past
+		'''
+		key = (name, step)
+		if key not in self.columns:
+			if step == 0:
+				values = self.data[name].values.astype('float64')[self.order]
+			else:
+				values = shift_sorted(self.column(name), self.codes, step)
+			self.columns[key] = values
+		return self.columns[key]
+
+
+	def unsort(self, values):
+		'''
+		Maps values in sorted order back to the row order of the panel.
+		'''
+		result = np.empty_like(values)
+		result[self.order] = values
+		return result
+
+
+def compute(data, names=None, shifter=None):
+	'''
+	Computes registered features for a (Symbol, Date) panel. Every feature
+	costs a few array operations over the whole panel, shifted columns are
+	shared between features.
+
+	Args:
+		data (pd.DataFrame): panel with a (Symbol, Date) MultiIndex containing
+			at least the columns referenced by the features
+		names (list): features to compute, all registered features if None
+		shifter (Shifter): sorted and shifted columns of data to reuse
+
+	Returns:
+		pd.DataFrame with one column per feature and the index of data
+	'''
+	# Compute all features if not specified otherwise
+	if names is None:
+		names = list(FEATURES)
+	if shifter is None:
+		shifter = Shifter(data)
+	result = OrderedDict()
+	for name in names:
+		feature = FEATURES[name]
+		# Difference at day t, then taken lag days in the past
+		diff = shifter.column(feature.source, feature.step) \
+				- shifter.column(feature.base)
+		if feature.rel:
+			diff = diff / shifter.column('Close')
+		if feature.lag:
+			diff = shift_sorted(diff, shifter.codes, -feature.lag)
+		result[name] = shifter.unsort(diff)
+	return pd.DataFrame(result, index=data.index)
+
+
+def shift_sorted(values, codes, step):
+	'''
+	Shifts values sorted by stock and date by step trading days within each
+	stock, rows without such a day of the same stock are NaN.
+
+	Args:
+		values (np.array): values sorted by stock and ascending date
+		codes (np.array): stock codes in the same order
+		step (integer): trading days to shift, negative for the past
+	'''
+	# Position of the shifted row and whether it belongs to the same stock
+	n = len(values)
+	index = np.arange(n) + step
+	valid = (index >= 0) & (index < n)
+	index = np.clip(index, 0, n - 1)
+	valid &= codes[index] == codes
+	return np.where(valid, values[index], np.nan)
@@ -1,6 +1,16 @@
 # External module imports
-import yahoo_finance as yf
 import pandas as pd
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+# Local imports
+import backtest as bt
+import cache as ch
+import features as ft
+import market as mk
+import panel as pn
+import pointintime as pit
+import providers as pv
+import universe as un
 
 #===============================================================================
 # Global module variables
@@ -17,8 +27,6 @@ DAX = ['ADS.DE','ALV.DE','BAS.DE','BAYN.DE','BEI.DE','BMW.DE','CBK.DE',
 		'LXS.DE','MRK.DE','MUV2.DE','RWE.DE','SAP.DE','SDF.DE','SIE.DE',
 		'TKA.DE','VOW3.DE']
 
-DAX = pd.np.random.permutation(DAX)
-
 #===============================================================================
 # Class for finance Data 
 #===============================================================================
@@ -28,170 +36,369 @@ class FinanceData:
 	Class containing financial data, loading, cleaning and enriching functions 
 	'''
 		
-	def __init__(self, name_list, start_date=START,	end_date=END):
+	def __init__(self, name_list, start_date=START,	end_date=END,
+				cache_dir=None, offline=False, provider=None, max_workers=8,
+				enrich=False, max_features=None, data=None):
 		'''
 		Constructor
+
+		Args:
+			name_list (list): symbols of the stocks to load
+			start_date: first day of the data
+			end_date: last day of the data
+			cache_dir (string): directory of the on-disk price cache. If set,
+				only date ranges missing from the cache are downloaded.
+			offline (boolean): if set, nothing is downloaded and the data is
+				read from the cache only.
+			provider (DataProvider): source of the data, defaults to yahoo
+			max_workers (integer): number of stocks loaded concurrently
+			enrich (boolean): if set, all registered features are computed
+				right away. Otherwise every feature is computed the first
+				time it is read, see feature.
+			max_features (integer): maximum number of memoized feature
+				columns. The least recently used one is dropped when the
+				limit is exceeded. No limit if set to None.
+			data (pd.DataFrame): already loaded (Symbol, Date) panel. If set,
+				nothing is loaded and feature columns it contains are
+				treated as memoized.
 		'''
 		# Copy the parameters to class variables
 		self.name_list = name_list
 		self.start_date = pd.to_datetime(start_date)
 		self.end_date = pd.to_datetime(end_date)
+		self.offline = offline
+		self.max_workers = max_workers
+		self.max_features = max_features
+		# Use yahoo if no other source is given
+		if provider is None:
+			self.provider = pv.YahooProvider()
+		else:
+			self.provider = provider
+		# Open the price cache if requested
+		if cache_dir is None:
+			self.cache = None
+		else:
+			self.cache = ch.PriceCache(cache_dir)
 		# Create empty data frame for containing the finance data
 		self.data = pd.DataFrame()
+		# Memo of computed feature columns in order of last use
+		self.features = OrderedDict()
+		self.shifter = None
+		# Point in time view of the data, built on first use
+		self.pit = None
+		# Price matrices and market context on top of them, built on first use
+		self.price_matrices = None
+		self.market_context = None
+		# Calendar and availability of the stocks, built on first use, and
+		# index memberships kept when it is rebuilt
+		self.calendar = None
+		self.memberships = {}
 		# Load the data
-		self.load_data()
+		if data is None:
+			self.load_data()
+		else:
+			self.data = data
+			for name in data.columns:
+				if name in ft.FEATURES:
+					self.features[name] = True
 		# Enrich the data
-		self.enrich_data()
+		if enrich:
+			self.enrich_data()
 		
 
+	@classmethod
+	def from_panel(cls, path, name_list=None, start_date=None, end_date=None):
+		'''
+		Creates finance data from a dense panel store, see panel.Panel. Only
+		the requested stocks and dates are read from disk.
+
+		Args:
+			path (string): directory of the panel
+			name_list (list): symbols of the stocks to load, all if None
+			start_date: first day of the data, first day of the panel if None
+			end_date: last day of the data, last day of the panel if None
+		'''
+		store = pn.Panel(path)
+		data = store.to_frame(symbols=name_list, start_date=start_date,
+							end_date=end_date)
+		dates = data.index.get_level_values('Date')
+		return cls(name_list=list(data.index.levels[0]),
+					start_date=start_date or dates.min(),
+					end_date=end_date or dates.max(), data=data)
+
+
+	def save_panel(self, path):
+		'''
+		Saves the price columns of the data as dense panel store, see
+		panel.Panel.
+
+		Args:
+			path (string): directory of the panel
+		'''
+		pn.Panel.from_frame(self.data, path)
+
+
 	def load_data(self):
 		'''
-		Loads data using the yahoo finance python api
-		'''
-		# Iterate over the name_list
-		for i,name in enumerate(self.name_list):
-			print('... Loading:', name, 'Index', i+1, 'of', len(self.name_list))
-			# Call the yahoo finance API
-			tmp_data = pd.DataFrame(
-							yf.Share(name).get_historical(
-										self.start_date.strftime('%Y-%m-%d'),
-										self.end_date.strftime('%Y-%m-%d')))
-			# Convert objects to numeric
-			tmp_data = tmp_data.apply(pd.to_numeric, args=('ignore',))
-			# Append the data
-			self.data = self.data.append(tmp_data)
-		# Convert date to date time object
-		tmp_data['Date'] = tmp_data['Date'].astype('datetime64')
+		Loads data of all stocks in name_list concurrently from the provider.
+		If a cache is set, only the date ranges missing from the cache are
+		requested from the provider.
+		'''
+		# Features of previously loaded data are no longer valid
+		self.invalidate()
+		# Load the stocks in a bounded thread pool, network calls overlap
+		with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+			frames = list(pool.map(self.load_symbol, self.name_list))
+		# Combine all stocks at once (newest date first, as returned by yahoo)
+		self.data = pd.concat(frames, ignore_index=True)\
+				.sort_values(['Symbol', 'Date'], ascending=[True, False])
 		# Set the index for easier data manipulation
 		self.data = self.data.set_index(['Symbol', 'Date'])
-		
 
-	def enrich_data(self):
+
+	def load_symbol(self, name, start_date=None, end_date=None):
 		'''
-		Collection of function calls to enrich data
-		
-		Reshape is necessary for 1 level case due to groupby bug explained here:
-			https://github.com/pydata/pandas/issues/5839
-		'''
-		# Enrich with within day uplift
-		self.data['Within_Day'] = pd.np.reshape(
-				self.data.groupby(level='Symbol')\
-				.apply(lambda x: within_day(data=x, rel=False)).values,
-				(len(self.data,)))
-		# Enrich with between day information
-		self.data['Between_Day'] = pd.np.reshape( 
-				self.data.groupby(level='Symbol')\
-				.apply(lambda x: between_day(data=x, rel=False)).values,
-				(len(self.data,)))
-				# Enrich with between day information
-		self.data['Previous_Day_1'] = pd.np.reshape( 
-				self.data.groupby(level='Symbol')\
-				.apply(lambda x: previous_day(data=x, rel=False, i=1)).values,
-				(len(self.data,)))
-		# Enrich with between day information
-		self.data['Previous_Day_2'] = pd.np.reshape( 
-				self.data.groupby(level='Symbol')\
-				.apply(lambda x: previous_day(data=x, rel=False, i=2)).values,
-				(len(self.data,)))
-		# Enrich with between day information
-		self.data['Previous_Day_3'] = pd.np.reshape( 
-				self.data.groupby(level='Symbol')\
-				.apply(lambda x: previous_day(data=x, rel=False, i=3)).values,
-				(len(self.data,)))
-		# Enrich with within day uplift
-		self.data['Within_Day_Rel'] = pd.np.reshape(
-				self.data.groupby(level='Symbol')\
-				.apply(lambda x: within_day(data=x, rel=True)).values,
-				(len(self.data,)))
-		# Enrich with between day information
-		self.data['Between_Day_Rel'] = pd.np.reshape( 
-				self.data.groupby(level='Symbol')\
-				.apply(lambda x: between_day(data=x, rel=True)).values,
-				(len(self.data,)))
-		# Enrich with between day information
-		self.data['Previous_Day_Rel_1'] = pd.np.reshape( 
-				self.data.groupby(level='Symbol')\
-				.apply(lambda x: previous_day(data=x, rel=True, i=1)).values,
-				(len(self.data,)))
-		# Enrich with between day information
-		self.data['Previous_Day_Rel_2'] = pd.np.reshape( 
-				self.data.groupby(level='Symbol')\
-				.apply(lambda x: previous_day(data=x, rel=True, i=2)).values,
-				(len(self.data,)))
-		# Enrich with between day information
-		self.data['Previous_Day_Rel_3'] = pd.np.reshape( 
-				self.data.groupby(level='Symbol')\
-				.apply(lambda x: previous_day(data=x, rel=True, i=3)).values,
-				(len(self.data,)))
+		Loads the data of a single stock, through the price cache if set.
+		Missing date ranges are fetched from the provider and stored in the
+		cache.
+
+		Args:
+			name (string): symbol of the stock to load
+			start_date: first day to load, self.start_date if None
+			end_date: last day to load, self.end_date if None
+
+		Returns:
+			pd.DataFrame with the data of the stock
+		'''
+		print('... Loading: {}'.format(name))
+		start_date = self.start_date if start_date is None else start_date
+		end_date = self.end_date if end_date is None else end_date
+		# Without cache everything comes from the provider
+		if self.cache is None:
+			return self.provider.fetch(name, start_date, end_date)
+		# Fetch only what is not yet cached
+		for start, end in self.cache.missing(name, start_date, end_date):
+			if self.offline:
+				print('... Offline, not fetching {} {} to {}'.format(
+						name, start.date(), end.date()))
+				continue
+			self.cache.write(name, self.provider.fetch(name, start, end),
+							start, end)
+		# Read the requested range from disk
+		return self.cache.read(name, start_date, end_date)
+
+
+	def extend(self, end_date):
+		'''
+		Loads the days after self.end_date up to end_date and appends them,
+		see append.
+
+		Args:
+			end_date: new last day of the data
+		'''
+		start_date = self.end_date + ch.DAY
+		end_date = pd.to_datetime(end_date)
+		with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+			frames = list(pool.map(
+						lambda name: self.load_symbol(name, start_date,
+													end_date),
+						self.name_list))
+		self.end_date = end_date
+		rows = pd.concat(frames, ignore_index=True)
+		if len(rows):
+			self.append(rows.set_index(['Symbol', 'Date']))
+
+
+	def append(self, rows):
+		'''
+		Appends rows of days after the last day of the data. Memoized features
+		are computed for the new rows only, from the last rows of each stock
+		they depend on. Rows whose features read following days, like
+		Between_Day, are updated as well.
+
+		Args:
+			rows (pd.DataFrame): (Symbol, Date) panel of the new days with the
+				price columns of the data
+		'''
+		names = [name for name in self.features if name in ft.FEATURES]
+		rows = rows[[name for name in self.data.columns
+					if name not in self.features]]
+		if names:
+			declared = [ft.FEATURES[name] for name in names]
+			ahead = max(max(feature.step, 0) for feature in declared)
+			behind = max(feature.lag for feature in declared)
+			# Newest rows of each stock the features of the new rows read,
+			# the data is sorted by descending date within each stock
+			context = self.data.groupby(level='Symbol', sort=False)\
+						.head(ahead + behind)[rows.columns]
+			tail = pd.concat([context, rows])
+			enriched = ft.compute(tail, names)
+			rows = rows.copy()
+			for name in names:
+				rows[name] = enriched[name].values[len(context):]
+			# Features of the newest old rows may read the new days
+			if ahead:
+				update = self.data.groupby(level='Symbol', sort=False)\
+							.head(ahead).index
+				changed = enriched.iloc[:len(context)].loc[update, names]
+				self.data.loc[update, names] = changed.values
+		# Keep the order of load_data, newest date first within each stock
+		self.data = pd.concat([self.data.reset_index(), rows.reset_index()],
+							ignore_index=True)\
+				.sort_values(['Symbol', 'Date'], ascending=[True, False])\
+				.set_index(['Symbol', 'Date'])
+		self.end_date = max(self.end_date,
+							self.data.index.get_level_values('Date').max())
+		# Sort orders of the previous data are no longer valid
+		self.shifter = None
+		self.pit = None
+		self.price_matrices = None
+		self.market_context = None
+		self.calendar = None
 		
 
-#===============================================================================
-# Non class functions defining the enriching operations
-#===============================================================================
+	def __getitem__(self, name):
+		'''
+		Returns a price or feature column, see feature.
+		'''
+		return self.feature(name)
 
-def within_day(data, rel=False):
-	'''
-	Calculates the difference between opening an closing price.
-	
-	Args:
-		data (pd.DataFrame: the financial data on which calculations are
-			to be performed.
-		rel (boolean): if set to false, the absolute difference is returned,
-			else the relative difference is returned.
-	
-	Returns:
-		pd.series of price difference using same index as data.
-	'''
-	# Apply the rel argument
-	if rel:
-		denominator = data['Close']
-	else:
-		denominator = 1.0
-	# Create and return the series object
-	return (data['Close'] - data['Open']) / denominator
 
+	def feature(self, name):
+		'''
+		Returns column name of the data. Registered features that are not yet
+		part of the data are computed and memoized as a column of self.data
+		on first use.
 
-def between_day(data, rel=True):
-	'''
-	Calculates the difference between opening price and closing price of the
-	previous day.
-	
-	Args:
-		data (pd.DataFrame: The financial data on which calculations are
-			to be performed.
-		rel (boolean): if set to false, the absolute difference is returned,
-			else the relative difference is returned.
-	
-	Returns:
-		pd.series of price difference using same index as data.
-	'''
-	# Apply the rel argument
-	if rel:
-		denominator = data['Close']
-	else:
-		denominator = 1.0
-	# Create and return the series object
-	return (data['Open'].shift(1) - data['Close']) / denominator
+		Args:
+			name (string): price column or name of a registered feature
 
+		Returns:
+			pd.Series with the index of self.data
+		'''
+		self.require([name])
+		return self.data[name]
 
-def previous_day(data, rel=True, i=1):
-	'''
-	Calculates the difference between opening price and closing price of the
-	previous day (i days in the past).
-	
-	Args:
-		data (pd.DataFrame: The financial data on which calculations are
-			to be performed.
-		rel (boolean): if set to false, the absolute difference is returned,
-			else the relative difference is returned.
-	
-	Returns:
-		pd.series of price difference using same index as data.
-	'''
-	# Apply the rel argument
-	if rel:
-		denominator = data['Close']
-	else:
-		denominator = 1.0
-	# Create and return the series object
-	return ((data['Open'].shift(1) - data['Close']) / denominator).shift(-i)
\ No newline at end of file
+
+	def require(self, names):
+		'''
+		Ensures that the given features are columns of self.data. Missing ones
+		are computed together in one pass, see features.compute.
+
+		Args:
+			names (iterable): names of registered features or price columns
+		'''
+		names = list(names)
+		# Mark memoized features as used and collect the missing ones
+		missing = []
+		for name in names:
+			if name in self.features:
+				self.features.move_to_end(name)
+			elif name not in self.data:
+				missing.append(name)
+		if not missing:
+			return
+		# The sort order of the panel is shared by all feature computations
+		if self.shifter is None:
+			self.shifter = ft.Shifter(self.data)
+		enriched = ft.compute(self.data, missing, self.shifter)
+		for name in missing:
+			self.data[name] = enriched[name].values
+			self.features[name] = True
+		# Evict least recently used features, but keep the requested ones,
+		# they are the most recently used
+		requested = len(set(name for name in names if name in self.features))
+		while self.max_features is not None \
+				and len(self.features) > max(self.max_features, requested):
+			self.invalidate([next(iter(self.features))])
+
+
+	def invalidate(self, names=None):
+		'''
+		Removes memoized features from self.data, they are recomputed on the
+		next read. Needs to be called whenever the price data changes.
+
+		Args:
+			names (list): features to remove, all memoized features if None
+		'''
+		# Dropping all features also drops the cached sort orders
+		if names is None:
+			names = list(self.features)
+			self.shifter = None
+			self.pit = None
+			self.price_matrices = None
+			self.market_context = None
+			self.calendar = None
+		for name in names:
+			if name in self.features:
+				del self.features[name]
+				del self.data[name]
+				# Matrices of the feature are dropped with the column
+				if self.price_matrices is not None:
+					self.price_matrices.matrices.pop(name, None)
+
+
+	def view(self):
+		'''
+		Returns a point in time view of the data. It is built on first use and
+		rebuilt only if the columns of the data have changed since.
+
+		Returns:
+			pointintime.PointInTimeView of self.data
+		'''
+		if self.pit is None or \
+				not self.pit.data.columns.equals(self.data.columns):
+			self.pit = pit.PointInTimeView(self.data)
+		return self.pit
+
+
+	def matrices(self):
+		'''
+		Returns the columns of the data as dates x symbols matrices, see
+		backtest.PriceMatrices. It is built on first use and rebuilt after
+		the data changed, so simulators on the same data share the matrices.
+
+		Returns:
+			backtest.PriceMatrices of self.data
+		'''
+		if self.price_matrices is None:
+			self.price_matrices = bt.PriceMatrices(self)
+		return self.price_matrices
+
+
+	def market(self):
+		'''
+		Returns a market context of the data, see market.MarketContext. The
+		matrices it reads are built once, every call returns a new context
+		with its own current day.
+
+		Returns:
+			market.MarketContext on top of the matrices of self.data
+		'''
+		if self.market_context is None:
+			self.market_context = mk.MarketContext.from_prices(
+															self.matrices())
+		return self.market_context.copy()
+
+
+	def universe(self):
+		'''
+		Returns the trading calendar and availability of the stocks, see
+		universe.Universe. It is built on first use and rebuilt after the
+		data changed. Index memberships are kept across rebuilds.
+
+		Returns:
+			universe.Universe of self.data
+		'''
+		if self.calendar is None:
+			self.calendar = un.Universe(self.data, self.memberships)
+		return self.calendar
+
+
+	def enrich_data(self):
+		'''
+		Enriches the data with all features registered in module features.
+		They are computed in one vectorized pass, see features.compute.
+		'''
+		# Compute all features and add them as columns
+		self.require(ft.FEATURES)
@@ -0,0 +1,272 @@
+# External imports
+import contextlib
+import cProfile
+import pstats
+import time
+import pandas as pd
+
+#===============================================================================
+# Global module variables
+#===============================================================================
+
+# Timed phases of a simulation step
+PHASES = ['slice', 'strategy', 'depot', 'result']
+
+# Counted events of a simulation step
+COUNTERS = ['trades', 'lookups', 'allocations']
+
+# Clock of the timers
+clock = time.perf_counter
+
+#===============================================================================
+# Classes for probing depots and market contexts
+#===============================================================================
+
+class DepotProbe:
+	'''
+	Stand-in for a depot passed to the strategy of an instrumented
+	simulation. Orders are forwarded to the depot, their duration, the
+	number of recorded transactions and the growth of the preallocated
+	arrays are accumulated until taken by the Instrument.
+	'''
+
+	def __init__(self, depot):
+		'''
+		Constructor of the DepotProbe class
+
+		Args:
+			depot (Depot object): depot receiving the orders
+		'''
+		self.depot = depot
+		self.seconds = 0.0
+		self.trades = 0
+		self.allocations = 0
+
+
+	def __getattr__(self, name):
+		# Everything but the orders is read from the depot
+		return getattr(self.depot, name)
+
+
+	def order(self, method, args, kwargs):
+		'''
+		Forwards an order to method of the depot and measures it.
+		'''
+		depot = self.depot
+		size = (len(depot.ledger), len(depot.ledger.records),
+				depot.quantity.shape[-1])
+		start = clock()
+		method(*args, **kwargs)
+		self.seconds += clock() - start
+		self.trades += len(depot.ledger) - size[0]
+		self.allocations += (len(depot.ledger.records) != size[1]) \
+							+ (depot.quantity.shape[-1] != size[2])
+
+
+	def buy(self, *args, **kwargs):
+		'''
+		See Depot.buy
+		'''
+		self.order(self.depot.buy, args, kwargs)
+
+
+	def sell(self, *args, **kwargs):
+		'''
+		See Depot.sell
+		'''
+		self.order(self.depot.sell, args, kwargs)
+
+
+	def buy_many(self, *args, **kwargs):
+		'''
+		See Depot.buy_many
+		'''
+		self.order(self.depot.buy_many, args, kwargs)
+
+
+	def sell_many(self, *args, **kwargs):
+		'''
+		See Depot.sell_many
+		'''
+		self.order(self.depot.sell_many, args, kwargs)
+
+
+class MarketProbe:
+	'''
+	Stand-in for a market context passed to the strategy of an instrumented
+	simulation, counting the price lookups until taken by the Instrument.
+	'''
+
+	def __init__(self, market):
+		'''
+		Constructor of the MarketProbe class
+
+		Args:
+			market (MarketContext): market context answering the lookups
+		'''
+		self.market = market
+		self.lookups = 0
+
+
+	def __getattr__(self, name):
+		# Everything but the lookups is read from the market context
+		return getattr(self.market, name)
+
+
+	def traded(self, stock):
+		'''
+		See MarketContext.traded
+		'''
+		self.lookups += 1
+		return self.market.traded(stock)
+
+
+	def open(self, stock):
+		'''
+		See MarketContext.open
+		'''
+		self.lookups += 1
+		return self.market.open(stock)
+
+
+	def close(self, stock):
+		'''
+		See MarketContext.close
+		'''
+		self.lookups += 1
+		return self.market.close(stock)
+
+
+	def prev_close(self, stock):
+		'''
+		See MarketContext.prev_close
+		'''
+		self.lookups += 1
+		return self.market.prev_close(stock)
+
+#===============================================================================
+# Class for instrumenting simulations
+#===============================================================================
+
+class Instrument:
+	'''
+	Opt-in instrumentation of simulations. A simulator given an Instrument
+	times the phases of every step, see PHASES: selecting the data of the
+	day, the strategy without its orders, the orders in the depot and
+	writing the result. It counts the transactions, the market lookups and
+	the growth of preallocated depot arrays, see COUNTERS.
+
+	Measurements are summed per scope, the strategy or the name of the run,
+	see summary. Hooks are called after every step with the measurements of
+	the step, e.g. to export them to a metrics system. Without an Instrument
+	the simulators take no measurements at all.
+	'''
+
+	def __init__(self, hooks=()):
+		'''
+		Constructor of the Instrument class
+
+		Args:
+			hooks (list): functions called as hook(event) after every step,
+				with event a dict containing scope, time and the values of
+				all phases and counters of the step
+		'''
+		self.hooks = list(hooks)
+		# Sums per scope
+		self.steps = {}
+		self.totals = {}
+		# Profile of the last profiled block, see profile
+		self.stats = None
+
+
+	def add_hook(self, hook):
+		'''
+		Adds a function called after every step, see constructor.
+		'''
+		self.hooks.append(hook)
+
+
+	def reset(self):
+		'''
+		Drops all measurements.
+		'''
+		self.steps = {}
+		self.totals = {}
+
+
+	def step(self, scope, time, timings, depot=None, market=None):
+		'''
+		Records the measurements of one simulation step.
+
+		Args:
+			scope (string): name the measurements are summed under
+			time (pd.Timestamp): simulated day
+			timings (dict): seconds by phase. The duration of the orders is
+				moved from phase strategy to phase depot.
+			depot (DepotProbe): probe of the depot, its counts are taken
+			market (MarketProbe): probe of the market, its counts are taken
+		'''
+		event = dict.fromkeys(PHASES + COUNTERS, 0)
+		event.update(timings)
+		if depot is not None:
+			event['depot'] += depot.seconds
+			event['strategy'] -= depot.seconds
+			event['trades'] += depot.trades
+			event['allocations'] += depot.allocations
+			depot.seconds, depot.trades, depot.allocations = 0.0, 0, 0
+		if market is not None:
+			event['lookups'] += market.lookups
+			market.lookups = 0
+		# Sum up under the scope
+		totals = self.totals.setdefault(scope, dict.fromkeys(
+													PHASES + COUNTERS, 0))
+		for name in totals:
+			totals[name] += event[name]
+		self.steps[scope] = self.steps.get(scope, 0) + 1
+		if self.hooks:
+			event['scope'] = scope
+			event['time'] = time
+			for hook in self.hooks:
+				hook(event)
+
+
+	def summary(self):
+		'''
+		Returns the measurements summed per scope.
+
+		Returns:
+			pd.DataFrame with one row per scope, the number of steps, the
+			seconds of each phase and in total, the counters and the mean
+			seconds per step
+		'''
+		summary = pd.DataFrame.from_dict(self.totals, orient='index',
+										columns=PHASES + COUNTERS)
+		summary.insert(0, 'steps', pd.Series(self.steps))
+		summary['seconds'] = summary[PHASES].sum(axis=1)
+		summary['per_step'] = summary['seconds'] / summary['steps']
+		summary.index.name = 'scope'
+		return summary
+
+
+	@contextlib.contextmanager
+	def profile(self, path=None):
+		'''
+		Profiles the enclosed block with cProfile, e.g.
+			with instrument.profile('run.prof'):
+				simulator.run()
+		The statistics are kept in self.stats and written to path if set.
+		The file can be read by pstats and converted to flame graphs by
+		tools like flameprof or snakeviz.
+
+		Args:
+			path (string): file the profile is written to
+		'''
+		profiler = cProfile.Profile()
+		profiler.enable()
+		try:
+			yield profiler
+		finally:
+			profiler.disable()
+			self.stats = pstats.Stats(profiler)
+			if path is not None:
+				profiler.dump_stats(path)
@@ -0,0 +1,177 @@
+# External imports
+import numpy as np
+
+#===============================================================================
+# Class for market data access in strategies
+#===============================================================================
+
+class MarketContext:
+	'''
+	Market data of the current day for strategies. Prices are kept in arrays
+	indexed by integer slots of the stocks, so every accessor is a dictionary
+	lookup and an array read. Only the current day and the closing price of
+	the previous trading day of each stock are accessible, which keeps the
+	point in time guarantee of the simulators.
+
+	The current day is either selected from precomputed dates x symbols
+	matrices (see from_prices and seek) or pushed bar by bar (see push).
+	'''
+
+	def __init__(self, symbols=()):
+		'''
+		Constructor of the MarketContext class
+
+		Args:
+			symbols (list): identifiers of the stocks known in advance,
+				further stocks are added when they are pushed
+		'''
+		# Mapping of stocks to slots of the arrays
+		self.symbols = []
+		self.slots = {}
+		# Prices of the current day by slot, NaN if not traded
+		self.open_prices = np.zeros(0)
+		self.close_prices = np.zeros(0)
+		self.prev_close_prices = np.zeros(0)
+		self.traded_mask = np.zeros(0, dtype='bool')
+		# Last closing price of every stock, only used by push
+		self.last_close = np.zeros(0)
+		# Current day and precomputed matrices, set by from_prices
+		self.time = None
+		self.matrices = None
+		self.positions = None
+		for stock in symbols:
+			self.slot(stock)
+
+
+	@classmethod
+	def from_prices(cls, prices):
+		'''
+		Creates a market context on top of precomputed price matrices.
+
+		Args:
+			prices (backtest.PriceMatrices): price matrices of the data
+		'''
+		close = prices['Close']
+		market = cls(close.columns)
+		market.matrices = {
+			'Open': prices['Open'].values,
+			'Close': close.values,
+			'Prev_Close': prices['Prev_Close'].reindex_like(close).values,
+			'Traded': prices['Traded'].values}
+		# Row of every date in the matrices
+		market.positions = {time: i for i, time in enumerate(close.index)}
+		return market
+
+
+	def copy(self):
+		'''
+		Returns a market context reading the same precomputed matrices, with
+		its own current day. Creating it costs O(stocks), not O(data).
+		'''
+		market = MarketContext(self.symbols)
+		market.matrices = self.matrices
+		market.positions = self.positions
+		return market
+
+
+	def slot(self, stock):
+		'''
+		Returns the slot of stock, a new one is assigned to unknown stocks.
+
+		Args:
+			stock (string): identifier of the stock
+		'''
+		slot = self.slots.get(stock)
+		if slot is None:
+			slot = len(self.symbols)
+			# Double the arrays if all slots are taken
+			if slot == len(self.traded_mask):
+				size = max(2 * slot, 16)
+				for name in ('open_prices', 'close_prices',
+							'prev_close_prices', 'last_close'):
+					array = np.full(size, np.nan)
+					array[:slot] = getattr(self, name)
+					setattr(self, name, array)
+				traded = np.zeros(size, dtype='bool')
+				traded[:slot] = self.traded_mask
+				self.traded_mask = traded
+			self.slots[stock] = slot
+			self.symbols.append(stock)
+		return slot
+
+
+	def seek(self, time):
+		'''
+		Makes time the current day, reading the rows of the precomputed
+		matrices without copying them.
+
+		Args:
+			time (pd.Timestamp): a date of the matrices
+		'''
+		i = self.positions[time]
+		self.time = time
+		self.open_prices = self.matrices['Open'][i]
+		self.close_prices = self.matrices['Close'][i]
+		self.prev_close_prices = self.matrices['Prev_Close'][i]
+		self.traded_mask = self.matrices['Traded'][i]
+
+
+	def push(self, time, symbols, open_prices, close_prices, traded=None):
+		'''
+		Makes time the current day with the prices of a new bar.
+
+		Args:
+			time (pd.Timestamp): date of the bar
+			symbols (list): stocks traded on that day
+			open_prices (np.array): opening prices in the same order
+			close_prices (np.array): closing prices in the same order
+			traded (np.array): whether each stock is traded, see
+				universe.rows_traded, all stocks of the bar if None
+		'''
+		slots = np.array([self.slot(stock) for stock in symbols], dtype='int64')
+		self.time = time
+		# Stocks not in the bar are not traded
+		self.traded_mask[:] = False
+		self.open_prices[:] = np.nan
+		self.close_prices[:] = np.nan
+		self.prev_close_prices[:] = np.nan
+		self.traded_mask[slots] = True if traded is None else traded
+		self.open_prices[slots] = open_prices
+		self.close_prices[slots] = close_prices
+		self.prev_close_prices[slots] = self.last_close[slots]
+		self.last_close[slots] = close_prices
+
+
+	def traded(self, stock):
+		'''
+		Returns whether stock is traded on the current day.
+		'''
+		slot = self.slots.get(stock)
+		return slot is not None and bool(self.traded_mask[slot])
+
+
+	def open(self, stock):
+		'''
+		Returns the opening price of stock on the current day, NaN if the
+		stock is not traded.
+		'''
+		slot = self.slots.get(stock)
+		return np.nan if slot is None else self.open_prices[slot]
+
+
+	def close(self, stock):
+		'''
+		Returns the closing price of stock on the current day, NaN if the
+		stock is not traded.
+		'''
+		slot = self.slots.get(stock)
+		return np.nan if slot is None else self.close_prices[slot]
+
+
+	def prev_close(self, stock):
+		'''
+		Returns the closing price of stock on its previous trading day, NaN if
+		the stock is not traded on the current day or has no previous day.
+		'''
+		slot = self.slots.get(stock)
+		return np.nan if slot is None else self.prev_close_prices[slot]
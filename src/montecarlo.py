@@ -0,0 +1,124 @@
+# External imports
+import numpy as np
+import pandas as pd
+# Local imports
+import depot as dp
+
+#===============================================================================
+# Class for Monte Carlo simulation of randomized strategies
+#===============================================================================
+
+class MonteCarloSimulator:
+	'''
+	Simulates many random paths of a randomized strategy at once. Like the
+	VectorSimulator it covers strategies buying at the closing price of the
+	previous day and selling at the opening price of the current day, here
+	investing all money into a single stock per day. The capital of all
+	paths is updated with array operations along the path axis.
+
+	Every path draws its random numbers from its own generator, seeded from
+	a numpy SeedSequence spawned from seed. A path therefore gives the same
+	result independent of the number of simulated paths.
+	'''
+
+	def __init__(self, finance_data, depot, strategy, n_paths=1000, seed=0,
+				start_time=None):
+		'''
+		Constructor of the MonteCarloSimulator class
+
+		Args:
+			finance_data (FinanceData): data on which the simulation is run
+			depot (Depot object): contains the starting capital and fees of
+				every path. It is not changed by the simulation.
+			strategy (function): called as strategy(prices, uniforms,
+				**kwargs) with prices a backtest.PriceMatrices object and
+				uniforms a dates x paths matrix of uniform random numbers in
+				[0, 1). Returns a dates x paths integer matrix with the column
+				of prices['Close'] bought on each day and path, or -1 for no
+				trade.
+			n_paths (integer): number of simulated paths
+			seed (integer): seed from which the seeds of the paths are spawned
+			start_time (pd.Timestamp): first day of the simulation
+		'''
+		# Copy references to parameters to class variables
+		self.finance = finance_data
+		self.depot = depot
+		self.strategy = strategy
+		self.n_paths = n_paths
+		self.seed = seed
+		# Compute the features read by the strategy
+		self.finance.require(getattr(self.strategy, 'features', []))
+		self.prices = finance_data.matrices()
+		# Dates of the simulation
+		self.dates = self.prices['Close'].index
+		if start_time is not None:
+			self.dates = self.dates[self.dates >= pd.to_datetime(start_time)]
+		self.start_time = min(self.dates)
+		# Seeds of the paths, the path number is the spawn key
+		self.seeds = np.random.SeedSequence(seed).spawn(n_paths)
+		# Capital of every path by date, set by run
+		self.capital = None
+
+
+	def uniforms(self):
+		'''
+		Draws the random numbers of all paths.
+
+		Returns:
+			np.array of shape dates x paths
+		'''
+		uniforms = np.empty((len(self.dates), self.n_paths))
+		for path, seed in enumerate(self.seeds):
+			uniforms[:, path] = np.random.default_rng(seed)\
+								.random(len(self.dates))
+		return uniforms
+
+
+	def run(self, **kwargs):
+		'''
+		Function to run the simulation of all paths
+
+		Returns:
+			pd.DataFrame with one row per path containing the final capital,
+			the maximum drawdown and the number of days the path traded
+		'''
+		# Chosen stock of every path on every day
+		chosen = np.asarray(self.strategy(prices=self.prices,
+										uniforms=self.uniforms(), **kwargs))
+		# Buy and sell prices of the chosen stocks
+		buy = self.prices['Prev_Close'].reindex(self.dates).values
+		sell = self.prices['Open'].reindex(self.dates).values
+		traded = self.prices['Traded'].reindex(self.dates).values
+		fees = self.depot.fees
+		capital = np.empty((len(self.dates), self.n_paths))
+		current = np.full(self.n_paths, float(self.depot.capital))
+		trades = np.zeros(self.n_paths, dtype='int64')
+		for i in range(len(self.dates)):
+			# Gather the prices of the chosen stocks, no trade if missing
+			column = np.maximum(chosen[i], 0)
+			buy_price = buy[i, column]
+			sell_price = sell[i, column]
+			tradable = (chosen[i] >= 0) & traded[i, column] \
+						& np.isfinite(buy_price) & np.isfinite(sell_price)
+			buy_price = np.where(tradable, buy_price, 1.0)
+			sell_price = np.where(tradable, sell_price, 1.0)
+			# Invest all money, pay fees twice and taxes on gains
+			quant = np.floor((current - fees) / buy_price)
+			quant = np.where(tradable & (quant > 0), quant, 0.0)
+			gain = sell_price - buy_price
+			current += quant * (gain - np.maximum(0.0, dp.TAX * gain)) \
+						- 2 * fees * (quant > 0)
+			trades += quant > 0
+			capital[i] = current
+		# Keep the capital of all paths for further analysis
+		self.capital = pd.DataFrame(capital, index=self.dates)
+		self.capital.columns.name = 'Path'
+		# Drawdown relative to the highest capital reached before
+		peak = np.maximum.accumulate(
+					np.vstack([np.full(self.n_paths, self.depot.capital),
+								capital]), axis=0)[1:]
+		drawdown = 1.0 - capital / peak
+		return pd.DataFrame({'capital': current,
+							'max_drawdown': drawdown.max(axis=0),
+							'trades': trades},
+							index=pd.RangeIndex(self.n_paths, name='Path'))
@@ -0,0 +1,150 @@
+# External imports
+import os
+import json
+import numpy as np
+import pandas as pd
+# Local imports
+import cache as ch
+
+#===============================================================================
+# Class for dense panel stores
+#===============================================================================
+
+class Panel:
+	'''
+	Dense, calendar aligned store of daily data as a symbols x dates x fields
+	float32 array with a symbols x dates availability mask. Symbols are
+	identified by their integer position in symbols. Both arrays are .npy
+	files in one directory and are memory mapped, so opening a panel is
+	instant and only the pages of the selected symbols and dates are read.
+	'''
+
+	def __init__(self, path, mode='r'):
+		'''
+		Constructor of the Panel class, opens an existing panel.
+
+		Args:
+			path (string): directory of the panel
+			mode (string): 'r' for read only, 'r+' for writing to the arrays
+		'''
+		# Copy parameters to class variables
+		self.path = path
+		# Small meta data is read completely
+		with open(os.path.join(path, 'meta.json')) as f:
+			meta = json.load(f)
+		self.symbols = pd.Index(meta['symbols'], name='Symbol')
+		self.fields = list(meta['fields'])
+		dates = np.load(os.path.join(path, 'dates.npy'))
+		self.dates = pd.DatetimeIndex(dates.astype('datetime64[ns]'),
+									name='Date')
+		# Large arrays are memory mapped
+		self.values = np.load(os.path.join(path, 'values.npy'),
+							mmap_mode=mode)
+		self.mask = np.load(os.path.join(path, 'mask.npy'), mmap_mode=mode)
+
+
+	@classmethod
+	def create(cls, path, symbols, dates, fields=ch.COLUMNS):
+		'''
+		Creates an empty panel on disk, all values NaN and not available.
+
+		Args:
+			path (string): directory of the panel, created if necessary
+			symbols (list): identifiers of the stocks
+			dates (list): trading calendar, sorted ascending
+			fields (list): names of the stored columns
+
+		Returns:
+			Panel opened for writing
+		'''
+		os.makedirs(path, exist_ok=True)
+		dates = pd.DatetimeIndex(dates).values.astype('datetime64[D]')
+		np.save(os.path.join(path, 'dates.npy'), dates)
+		shape = (len(symbols), len(dates))
+		values = np.lib.format.open_memmap(os.path.join(path, 'values.npy'),
+										mode='w+', dtype='float32',
+										shape=shape + (len(fields),))
+		values[...] = np.nan
+		np.lib.format.open_memmap(os.path.join(path, 'mask.npy'), mode='w+',
+								dtype='bool', shape=shape)
+		# Meta data last, it marks the panel as complete
+		with open(os.path.join(path, 'meta.json'), 'w') as f:
+			json.dump({'symbols': list(symbols), 'fields': list(fields)}, f)
+		return cls(path, mode='r+')
+
+
+	@classmethod
+	def from_frame(cls, data, path, fields=None):
+		'''
+		Stores a (Symbol, Date) panel as dense panel.
+
+		Args:
+			data (pd.DataFrame): panel with a (Symbol, Date) MultiIndex
+			path (string): directory of the panel
+			fields (list): columns to store, all price columns if None
+
+		Returns:
+			Panel opened for writing
+		'''
+		if fields is None:
+			fields = [name for name in ch.COLUMNS if name in data]
+		symbols = data.index.levels[data.index.names.index('Symbol')]
+		dates = data.index.get_level_values('Date')
+		calendar = pd.DatetimeIndex(np.unique(dates.values))
+		panel = cls.create(path, symbols, calendar, fields)
+		# Scatter the rows into the dense arrays
+		s = data.index.codes[data.index.names.index('Symbol')]
+		d = calendar.get_indexer(dates)
+		panel.values[s, d] = data[fields].values.astype('float32')
+		panel.mask[s, d] = True
+		panel.flush()
+		return panel
+
+
+	def flush(self):
+		'''
+		Writes changes of the arrays to disk.
+		'''
+		for array in (self.values, self.mask):
+			if isinstance(array, np.memmap):
+				array.flush()
+
+
+	def to_frame(self, symbols=None, start_date=None, end_date=None,
+				fields=None):
+		'''
+		Loads a part of the panel as (Symbol, Date) data frame, containing the
+		available rows only. Like FinanceData.data the rows are sorted by
+		symbol and descending date.
+
+		Args:
+			symbols (list): stocks to load, all if None
+			start_date: first day to load, first day of the panel if None
+			end_date: last day to load, last day of the panel if None
+			fields (list): columns to load, all if None
+
+		Returns:
+			pd.DataFrame with float64 columns
+		'''
+		# Positions of the requested part, slices keep the memory map lazy
+		if symbols is None:
+			s = slice(None)
+		else:
+			s = np.sort(self.symbols.get_indexer(symbols))
+			if (s < 0).any():
+				raise KeyError('Symbols not in panel: {}'.format(
+						[x for x in symbols if x not in self.symbols]))
+		first = 0 if start_date is None else \
+				self.dates.searchsorted(pd.to_datetime(start_date), 'left')
+		last = len(self.dates) if end_date is None else \
+				self.dates.searchsorted(pd.to_datetime(end_date), 'right')
+		f = [self.fields.index(name) for name in (fields or self.fields)]
+		# Only the pages of available rows are read, newest date first
+		rows_s, rows_d = np.nonzero(self.mask[s, first:last][:, ::-1])
+		values = self.values[s, first:last][:, ::-1][rows_s, rows_d][:, f]
+		index = pd.MultiIndex(levels=[self.symbols[s],
+									self.dates[first:last]],
+							codes=[rows_s, last - first - 1 - rows_d],
+							names=['Symbol', 'Date'])
+		return pd.DataFrame(values.astype('float64'), index=index,
+							columns=[self.fields[i] for i in f])
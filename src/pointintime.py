@@ -0,0 +1,88 @@
+# External imports
+import numpy as np
+
+#===============================================================================
+# Class for point in time views of finance data
+#===============================================================================
+
+class PointInTimeView:
+	'''
+	Point in time access to a (Symbol, Date) panel. The rows are sorted once
+	by descending date, so everything known up to a date is a contiguous
+	block at the end of the panel and is returned as a slice without copying
+	the data. Within every date the rows are sorted by symbol, hence the rows
+	of a single stock keep the newest date first. Panels already in this
+	order are not copied.
+	'''
+
+	def __init__(self, data):
+		'''
+		Constructor of the PointInTimeView class
+
+		Args:
+			data (pd.DataFrame): panel with a (Symbol, Date) MultiIndex. Columns
+				added to it afterwards are not part of the view.
+		'''
+		# Sort rows by descending date and ascending symbol
+		codes = np.asarray(data.index.codes[data.index.names.index('Symbol')])
+		dates = data.index.get_level_values('Date').values\
+				.astype('datetime64[ns]')
+		step = dates[1:] - dates[:-1]
+		if np.all((step < np.timedelta64(0)) | ((step == np.timedelta64(0))
+												& (codes[1:] > codes[:-1]))):
+			# Already sorted, e.g. shared by sweep.SharedPanel, no copy
+			self.data = data.iloc[0:]
+		else:
+			self.data = data.take(np.lexsort((codes,
+											-dates.astype('int64'))))
+		# Sorted unique dates and number of rows on each date
+		self.dates, counts = np.unique(dates, return_counts=True)
+		# Rows with date <= dates[i] start at position start[i]
+		self.start = len(data) - np.cumsum(counts)
+		self.end = self.start + counts
+
+
+	def position(self, time):
+		'''
+		Returns the index of the last date in self.dates not after time or -1
+		if time is before the first date.
+
+		Args:
+			time (pd.Timestamp): point in time
+		'''
+		return np.searchsorted(self.dates, np.datetime64(time), 'right') - 1
+
+
+	def at(self, time):
+		'''
+		Returns all rows known at time, i.e. with date not after time.
+
+		Args:
+			time (pd.Timestamp): point in time
+
+		Returns:
+			pd.DataFrame slice of the sorted panel, not a copy
+		'''
+		i = self.position(time)
+		# Nothing known before the first date
+		if i < 0:
+			return self.data.iloc[len(self.data):]
+		return self.data.iloc[self.start[i]:]
+
+
+	def bar(self, time):
+		'''
+		Returns the rows of exactly the date time.
+
+		Args:
+			time (pd.Timestamp): point in time
+
+		Returns:
+			pd.DataFrame slice of the sorted panel, empty if time is no date
+				of the panel
+		'''
+		i = self.position(time)
+		# Time is not a date of the panel
+		if i < 0 or self.dates[i] != np.datetime64(time):
+			return self.data.iloc[0:0]
+		return self.data.iloc[self.start[i]:self.end[i]]
@@ -0,0 +1,280 @@
+# External imports
+import os
+import time
+import zlib
+import threading
+import numpy as np
+import pandas as pd
+# Local imports
+import cache as ch
+
+#===============================================================================
+# Base class for data providers
+#===============================================================================
+
+class DataProvider:
+	'''
+	Base class for sources of daily OHLCV data. Subclasses implement
+	get_history, the fetch method adds rate limiting and retries on top of it
+	and is safe to call from several threads at once.
+	'''
+
+	def __init__(self, rate_limit=None, retries=0, backoff=1.0):
+		'''
+		Constructor of the DataProvider class
+
+		Args:
+			rate_limit (float): maximum number of requests per second over all
+				threads. If set to None requests are not limited.
+			retries (integer): number of times a failed request is repeated
+			backoff (float): seconds to wait before the first retry, doubled
+				for every further retry
+		'''
+		# Copy parameters to class variables
+		self.rate_limit = rate_limit
+		self.retries = retries
+		self.backoff = backoff
+		# Time at which the next request may be sent
+		self.next_request = 0.0
+		self.lock = threading.Lock()
+
+
+	def get_history(self, name, start_date, end_date):
+		'''
+		Returns the historical data of a single stock.
+
+		Args:
+			name (string): symbol of the stock
+			start_date (pd.Timestamp): first day of the requested range
+			end_date (pd.Timestamp): last day of the requested range
+
+		Returns:
+			pd.DataFrame with columns Symbol, Date and cache.COLUMNS
+		'''
+		raise NotImplementedError
+
+
+	def wait(self):
+		'''
+		Blocks until the rate limit allows the next request.
+		'''
+		# No limit set
+		if not self.rate_limit:
+			return
+		# Reserve the next free slot while holding the lock, sleep without it
+		with self.lock:
+			now = time.monotonic()
+			slot = max(now, self.next_request)
+			self.next_request = slot + 1.0 / self.rate_limit
+		time.sleep(max(0.0, slot - now))
+
+
+	def fetch(self, name, start_date, end_date):
+		'''
+		Rate limited call of get_history which is retried on failure.
+
+		Args:
+			name (string): symbol of the stock
+			start_date (pd.Timestamp): first day of the requested range
+			end_date (pd.Timestamp): last day of the requested range
+
+		Returns:
+			pd.DataFrame with columns Symbol, Date and cache.COLUMNS
+		'''
+		for attempt in range(self.retries + 1):
+			self.wait()
+			try:
+				return self.get_history(name, start_date, end_date)
+			except Exception as error:
+				# Give up after the last retry
+				if attempt == self.retries:
+					raise
+				print('... Retrying: {} after {!r}'.format(name, error))
+				time.sleep(self.backoff * 2 ** attempt)
+
+#===============================================================================
+# Data provider implementations
+#===============================================================================
+
+class YahooProvider(DataProvider):
+	'''
+	Loads data using the yahoo finance python api.
+	'''
+
+	def __init__(self, rate_limit=5.0, retries=3, backoff=1.0):
+		'''
+		Constructor of the YahooProvider class, see DataProvider for the
+		arguments. By default requests are limited to five per second.
+		'''
+		DataProvider.__init__(self, rate_limit=rate_limit, retries=retries,
+							backoff=backoff)
+
+
+	def get_history(self, name, start_date, end_date):
+		'''
+		See DataProvider.get_history
+		'''
+		# Only needed when yahoo is actually used
+		import yahoo_finance as yf
+		# Call the yahoo finance API
+		tmp_data = pd.DataFrame(yf.Share(name).get_historical(
+										start_date.strftime('%Y-%m-%d'),
+										end_date.strftime('%Y-%m-%d')),
+								columns=['Symbol', 'Date'] + ch.COLUMNS)
+		# Convert objects to numeric
+		for column in ch.COLUMNS:
+			tmp_data[column] = pd.to_numeric(tmp_data[column])
+		# Convert date to date time object
+		tmp_data['Date'] = pd.to_datetime(tmp_data['Date'])
+		tmp_data['Symbol'] = name
+		return tmp_data
+
+
+class CSVProvider(DataProvider):
+	'''
+	Loads data from local csv files, one file <symbol>.csv per stock with a
+	Date column and the price columns. Serves as offline stand-in for yahoo,
+	e.g. for test fixtures.
+	'''
+
+	def __init__(self, path, rate_limit=None, retries=0, backoff=1.0):
+		'''
+		Constructor of the CSVProvider class
+
+		Args:
+			path (string): directory containing the csv files
+			see DataProvider for the remaining arguments
+		'''
+		DataProvider.__init__(self, rate_limit=rate_limit, retries=retries,
+							backoff=backoff)
+		# Copy parameters to class variables
+		self.path = path
+
+
+	def get_history(self, name, start_date, end_date):
+		'''
+		See DataProvider.get_history
+		'''
+		# Read the whole file and reduce it to the requested range
+		tmp_data = pd.read_csv(os.path.join(self.path, name + '.csv'))
+		tmp_data['Date'] = pd.to_datetime(tmp_data['Date'])
+		tmp_data = tmp_data[(tmp_data['Date'] >= start_date) &
+							(tmp_data['Date'] <= end_date)]
+		# Adjusted close is optional in fixtures
+		if 'Adj_Close' not in tmp_data:
+			tmp_data['Adj_Close'] = tmp_data['Close']
+		tmp_data['Symbol'] = name
+		return tmp_data[['Symbol', 'Date'] + ch.COLUMNS]\
+				.reset_index(drop=True)
+
+
+class SyntheticProvider(DataProvider):
+	'''
+	Generates random daily data following a geometric brownian motion on
+	business days. The path of every stock only depends on seed, the symbol
+	and origin, so overlapping requests return identical prices.
+
+	Like real data, stocks can miss single days and can have listing gaps:
+	a late listing, after which the stock has no data before its listing
+	day, and a suspension of up to a year without data.
+	'''
+
+	def __init__(self, seed=0, origin='1990-01-01', drift=0.05,
+				volatility=0.25, price=100.0, missing=0.0, gaps=0.0):
+		'''
+		Constructor of the SyntheticProvider class
+
+		Args:
+			seed (integer): seed shared by all stocks
+			origin: first day of every generated path
+			drift (float): annual drift of the prices
+			volatility (float): annual volatility of the prices
+			price (float): price at origin
+			missing (float): probability of a stock missing a business day
+			gaps (float): probability of a stock being listed late and,
+				independently, of a stock being suspended once
+		'''
+		DataProvider.__init__(self)
+		# Copy parameters to class variables
+		self.seed = seed
+		self.origin = pd.to_datetime(origin)
+		self.drift = drift
+		self.volatility = volatility
+		self.price = price
+		self.missing = missing
+		self.gaps = gaps
+
+
+	@staticmethod
+	def symbols(n, prefix='SYN'):
+		'''
+		Returns n symbols for a synthetic universe.
+
+		Args:
+			n (integer): number of symbols
+			prefix (string): common beginning of the symbols
+		'''
+		return ['{}{:05d}'.format(prefix, i) for i in range(n)]
+
+
+	def random(self, name, stream):
+		'''
+		Returns the random generator of one stream of random numbers of a
+		stock. Every quantity has its own stream, so its values do not
+		depend on the number of values drawn from the others.
+		'''
+		key = [self.seed, zlib.crc32(name.encode('utf-8'))]
+		return np.random.RandomState(key + [stream] if stream else key)
+
+
+	def available(self, name, n):
+		'''
+		Returns the mask of the first n business days after origin on which
+		the stock has data.
+		'''
+		mask = np.ones(n, dtype='bool')
+		if self.missing:
+			mask &= self.random(name, 4).random_sample(n) >= self.missing
+		if self.gaps:
+			random = self.random(name, 5)
+			listed, suspended = random.random_sample(2) < self.gaps
+			# Listing within ten years, suspension within thirty years
+			listing = random.randint(0, 2520)
+			start = random.randint(0, 7560)
+			length = random.randint(20, 253)
+			if listed:
+				mask[:listing] = False
+			if suspended:
+				mask[start:start + length] = False
+		return mask
+
+
+	def get_history(self, name, start_date, end_date):
+		'''
+		See DataProvider.get_history
+		'''
+		# Generate the path from origin so that it is independent of the range
+		days = np.arange(np.datetime64(self.origin, 'D'),
+						np.datetime64(pd.to_datetime(end_date), 'D') + 1)
+		dates = pd.DatetimeIndex(days[np.is_busday(days)].astype(
+														'datetime64[ns]'))
+		n = len(dates)
+		# Daily log returns from close to close and from close to next open
+		dt = 1.0 / 252
+		sigma = self.volatility * np.sqrt(dt)
+		mu = (self.drift - 0.5 * self.volatility ** 2) * dt
+		close = self.price * np.exp(np.cumsum(
+						mu + sigma * self.random(name, 0).standard_normal(n)))
+		gap = np.exp(0.3 * sigma * self.random(name, 1).standard_normal(n))
+		open_ = np.concatenate([[self.price], close[:-1]]) * gap
+		# Highs and lows enclose open and close
+		spread = np.abs(sigma * self.random(name, 2).standard_normal((n, 2)))
+		high = np.maximum(open_, close) * (1.0 + spread[:, 0])
+		low = np.minimum(open_, close) * (1.0 - spread[:, 1])
+		volume = self.random(name, 3).randint(1e5, 1e7, n).astype('float64')
+		tmp_data = pd.DataFrame({'Symbol': name, 'Date': dates,
+								'Open': open_, 'High': high, 'Low': low,
+								'Close': close, 'Volume': volume,
+								'Adj_Close': close})
+		keep = self.available(name, n) & (dates >= pd.to_datetime(start_date))
+		return tmp_data[keep].reset_index(drop=True)
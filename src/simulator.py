@@ -1,5 +1,11 @@
 # External imports
+import os
+import bisect
+import pickle
+import numpy as np
 import pandas as pd
+# Local imports
+import instrument as ins
 
 #===============================================================================
 # Class for simulating strategies 
@@ -9,7 +15,8 @@ class Simulator:
 	'''
 	Class for simulating simplest trading strategies and their outcome
 	'''
-	def __init__(self, finance_data, depot, strategy, start_time=None):
+	def __init__(self, finance_data, depot, strategy, start_time=None,
+				instrument=None, end_time=None, checkpoint=None):
 		'''
 		Constructor of the simulator class
 		
@@ -17,43 +24,261 @@ class Simulator:
 			finance_data (pd.DataFrame): data frame containing all the finance
 				data on which the simulation is run
 			depot (Depot object): contains the starting parameters for the
-				simulation.
-			strategy (function): the strategy used for buying and selling
+				simulation. For a depot.DepotArray the result contains the
+				capital of every account.
+			strategy (function): the strategy used for buying and selling.
+				Features listed in its attribute features are computed
+				before the simulation. Besides data, depot and time it
+				receives bar, the rows of the current day, market, a
+				market.MarketContext of the current day, universe, the
+				universe.Universe of the data for querying tradable
+				stocks, and state, a dict it can use to keep data across
+				days.
+			instrument (instrument.Instrument): if set, the phases of every
+				day are timed and summed under the name of the strategy
+			end_time (pd.Timestamp): last day of the simulation, the last
+				day of the data if None
+			checkpoint (string): if set, run writes the state of the
+				simulation at the last day before monetizing to this file,
+				see resume
 		'''
 		# Copy references to parameters to class variables
 		self.finance = finance_data
 		self.depot = depot
 		self.strategy = strategy
 		self.start_time = start_time
-		# Create sorted list of unique dates from given finance data
-		self.dates = list(set(self.finance.data.reset_index()['Date']))
-		self.dates.sort()
+		self.instrument = instrument
+		self.checkpoint = checkpoint
+		# State the strategy keeps across the simulated days
+		self.state = {}
+		# Last day simulated before, set when resuming from a checkpoint
+		self.cursor = None
+		# Compute the features read by the strategy
+		self.finance.require(getattr(self.strategy, 'features', []))
+		# Data sorted for point in time access, shared between simulators
+		self.view = self.finance.view()
+		# Prices of the current day for the strategy, the matrices are shared
+		# between simulators
+		self.market = self.finance.market()
+		# Trading calendar and availability, shared between simulators
+		self.universe = self.finance.universe()
+		self.dates = list(self.universe.calendar)
 		# Reduce dates to those after start_time
 		if self.start_time:
 			#List comprehension to apply start date
 			self.dates = [x for x in self.dates if x >= self.start_time]
 		else:
 			self.start_time = min(self.dates)
+		# Reduce dates to those up to end_time
+		if end_time is not None:
+			self.dates = [x for x in self.dates if x <= end_time]
+		self.end_time = max(self.dates)
 		# Create the simulation result object
 		self.result = pd.DataFrame(index=self.dates)
-		self.result['capital'] = pd.np.nan 
-	
+		if np.ndim(self.depot.capital):
+			for account in range(len(self.depot.capital)):
+				self.result[account] = np.nan
+			self.result.columns.name = 'Account'
+		else:
+			self.result['capital'] = np.nan
+
+
+	@classmethod
+	def resume(cls, finance_data, checkpoint, end_time=None,
+				instrument=None):
+		'''
+		Continues a simulation from a checkpoint written by run. Only the days
+		of finance_data after the last checkpointed day are simulated, with
+		the depot and strategy state of that day. The checkpoint is updated
+		by the next run.
+
+		Args:
+			finance_data (FinanceData): data containing the checkpointed
+				days and the new ones, see FinanceData.extend
+			checkpoint (string): file written by run
+			end_time, instrument: see constructor
+
+		Returns:
+			Simulator with the capital of the checkpointed days in result
+		'''
+		with open(checkpoint, 'rb') as f:
+			saved = pickle.load(f)
+		simulator = cls(finance_data, saved['depot'], saved['strategy'],
+						start_time=saved['start_time'], end_time=end_time,
+						instrument=instrument, checkpoint=checkpoint)
+		simulator.state = saved['state']
+		simulator.cursor = saved['cursor']
+		capital = saved['capital']
+		simulator.result.loc[capital.index] = capital.values
+		return simulator
+
+
+	def save_checkpoint(self, time):
+		'''
+		Writes depot, strategy state and capital up to time to the checkpoint
+		file. The file is replaced at once, a crash does not corrupt it.
+
+		Args:
+			time (pd.Timestamp): last simulated day
+		'''
+		saved = {'cursor': time, 'start_time': self.start_time,
+				'strategy': self.strategy, 'depot': self.depot,
+				'state': self.state,
+				'capital': self.result.loc[:time].copy()}
+		tmp_path = self.checkpoint + '.tmp'
+		with open(tmp_path, 'wb') as f:
+			pickle.dump(saved, f, protocol=pickle.HIGHEST_PROTOCOL)
+		os.replace(tmp_path, self.checkpoint)
+
 		
 	def run(self, **kwargs):
 		'''
 		Function to run the simulation of a strategy
 		'''
 		# Initialize back-testing variables
-		for time in self.dates:
-			# only pass data that should be known
-			time_data = self.finance.data.select(lambda x: x[1] <= time)
-			self.strategy(data=time_data, depot=self.depot, time=time, **kwargs)
+		depot = self.depot
+		market = self.market
+		# Measure through probes only if instrumented
+		timed = self.instrument is not None
+		if timed:
+			depot = ins.DepotProbe(self.depot)
+			market = ins.MarketProbe(self.market)
+			scope = getattr(self.strategy, '__name__', 'strategy')
+		# After resuming only the new days are simulated
+		first = 0
+		if self.cursor is not None:
+			first = bisect.bisect_right(self.dates, self.cursor)
+		for time in self.dates[first:]:
+			if timed: start = ins.clock()
+			# only pass data that should be known (a slice, not a copy)
+			time_data = self.view.at(time)
+			bar = self.view.bar(time)
+			# Transactions of the depot are recorded at the simulated time
+			self.depot.time = time
+			self.market.seek(time)
+			if timed: sliced = ins.clock()
+			self.strategy(data=time_data, depot=depot, time=time, bar=bar,
+						market=market, universe=self.universe,
+						state=self.state, **kwargs)
+			if timed: decided = ins.clock()
 			# Save the time development of the capital
-			self.result.loc[time]['capital'] = self.depot.capital
-		# At end of simulation monetize all your assets at closing price
+			self.result.loc[time] = self.depot.capital
+			if timed:
+				self.instrument.step(scope, time,
+									{'slice': sliced - start,
+									'strategy': decided - sliced,
+									'result': ins.clock() - decided},
+									depot, market)
+		# Keep the state before monetizing to continue later
 		time = max(self.dates)
-		self.depot.monetize(self.finance.data.xs(time,level=1)['Close'])
+		if self.checkpoint is not None:
+			self.save_checkpoint(time)
+		# At end of simulation monetize all your assets at closing price
+		self.depot.monetize(self.view.bar(time).xs(time, level=1)['Close'])
 		# Sace the capital in results object
-		self.result.loc[time]['capital'] = self.depot.capital
+		self.result.loc[time] = self.depot.capital
 		# For convenience return the result object
 		return self.result
+
+
+#===============================================================================
+# Class for simulating several strategies at once
+#===============================================================================
+
+class MultiSimulator:
+	'''
+	Simulates several strategies, each with its own depot, in a single pass
+	over the dates. The point in time slice, the rows of the current day and
+	the market context are built once per day and passed to all strategies,
+	so comparing many strategies costs little more than simulating one.
+	'''
+	def __init__(self, finance_data, runs, start_time=None, instrument=None):
+		'''
+		Constructor of the MultiSimulator class
+
+		Args:
+			finance_data (FinanceData): data on which the simulation is run
+			runs (dict): maps the name of each run to a tuple (strategy,
+				depot) or (strategy, depot, kwargs), with kwargs the
+				keyword arguments only passed to that strategy. Strategies
+				are called like in the Simulator.
+			start_time (pd.Timestamp): first day of the simulation
+			instrument (instrument.Instrument): if set, the phases of every
+				day are timed and summed under the name of each run, the
+				shared selection of the data under MultiSimulator
+		'''
+		# Copy references to parameters to class variables
+		self.finance = finance_data
+		self.instrument = instrument
+		self.names = list(runs)
+		self.strategies = [runs[name][0] for name in self.names]
+		self.depots = [runs[name][1] for name in self.names]
+		self.kwargs = [runs[name][2] if len(runs[name]) > 2 else {}
+						for name in self.names]
+		# State every strategy keeps across the simulated days
+		self.states = [{} for _ in self.names]
+		# Compute the features read by any of the strategies
+		self.finance.require([name for strategy in self.strategies
+							for name in getattr(strategy, 'features', [])])
+		# Data and prices of the current day, shared by all strategies
+		self.view = self.finance.view()
+		self.market = self.finance.market()
+		self.universe = self.finance.universe()
+		self.dates = list(self.universe.calendar)
+		if start_time:
+			self.dates = [x for x in self.dates if x >= start_time]
+		self.start_time = min(self.dates)
+
+
+	def run(self, **kwargs):
+		'''
+		Function to run the simulation of all strategies
+
+		Args:
+			kwargs: keyword arguments passed to all strategies
+
+		Returns:
+			pd.DataFrame with the capital of every run by date, one column
+			per name
+		'''
+		capital = np.empty((len(self.dates), len(self.names)))
+		depots = self.depots
+		markets = [self.market] * len(self.names)
+		# Measure through probes only if instrumented
+		timed = self.instrument is not None
+		if timed:
+			depots = [ins.DepotProbe(depot) for depot in self.depots]
+			markets = [ins.MarketProbe(self.market) for _ in self.names]
+		runs = list(zip(self.names, self.strategies, self.depots, depots,
+						markets, self.states,
+						[dict(kwargs, **extra) for extra in self.kwargs]))
+		for i, time in enumerate(self.dates):
+			if timed: start = ins.clock()
+			# Slice, bar and market once for all strategies
+			time_data = self.view.at(time)
+			bar = self.view.bar(time)
+			self.market.seek(time)
+			if timed:
+				self.instrument.step('MultiSimulator', time,
+									{'slice': ins.clock() - start})
+			for j, (name, strategy, depot, passed, market, state,
+					extra) in enumerate(runs):
+				depot.time = time
+				if timed: start = ins.clock()
+				strategy(data=time_data, depot=passed, time=time, bar=bar,
+						market=market, universe=self.universe, state=state,
+						**extra)
+				if timed: decided = ins.clock()
+				capital[i, j] = depot.capital
+				if timed:
+					self.instrument.step(name, time,
+										{'strategy': decided - start,
+										'result': ins.clock() - decided},
+										passed, market)
+		# At end of simulation monetize all assets at closing price
+		time = max(self.dates)
+		close = self.view.bar(time).xs(time, level=1)['Close']
+		for j, depot in enumerate(self.depots):
+			depot.monetize(close)
+			capital[-1, j] = depot.capital
+		return pd.DataFrame(capital, index=self.dates, columns=self.names)
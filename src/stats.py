@@ -0,0 +1,357 @@
+# External imports
+import numpy as np
+import pandas as pd
+
+#===============================================================================
+# Non class functions for incremental statistics
+#===============================================================================
+
+def locate(index, symbols):
+	'''
+	Returns the positions of stocks in the arrays of a statistics object.
+
+	Args:
+		index (pd.Index): identifiers of the stocks of the object
+		symbols (list): identifiers of the requested stocks
+
+	Returns:
+		np.array of positions in the order of symbols
+	'''
+	slots = index.get_indexer(symbols)
+	# Unknown stocks would silently be written to the last position
+	if (slots < 0).any():
+		raise KeyError('Unknown stocks: {}'.format(
+						np.asarray(symbols)[slots < 0].tolist()))
+	return slots
+
+
+def grow(stats, symbols, fills):
+	'''
+	Adds slots for the stocks of symbols not yet known to a statistics
+	object. The arrays are extended by one row per new stock, filled with
+	the given values.
+
+	Args:
+		stats (RollingStats or RollingOLS): object to extend
+		symbols (list): identifiers of stocks
+		fills (dict): fill value by name of the arrays to extend
+	'''
+	new = pd.Index(symbols)
+	new = new[~new.isin(stats.symbols)].unique()
+	if not len(new):
+		return
+	stats.symbols = stats.symbols.append(new)
+	for name, fill in fills.items():
+		array = getattr(stats, name)
+		rows = np.full((len(new),) + array.shape[1:], fill, dtype=array.dtype)
+		setattr(stats, name, np.concatenate([array, rows]))
+
+#===============================================================================
+# Class for incremental statistics
+#===============================================================================
+
+class RollingStats:
+	'''
+	Incremental statistics per stock over the last window observations of
+	each stock, or over all observations if window is None. Strategies keep
+	an object of this class across simulation steps and update it with the
+	values of each new day, which costs O(stocks) instead of recomputing the
+	statistics over the whole history.
+
+	An observation with value NaN counts as observation, but neither as hit
+	nor for sum and mean.
+	'''
+
+	def __init__(self, symbols, window=None):
+		'''
+		Constructor of the RollingStats class
+
+		Args:
+			symbols (list): identifiers of all stocks
+			window (integer): number of observations per stock taken into
+				account, all observations if set to None
+		'''
+		# Mapping of stocks to positions in the arrays
+		self.symbols = pd.Index(symbols)
+		self.window = window
+		n = len(self.symbols)
+		# Number of observations, of non NaN values and of positive values
+		self.count = np.zeros(n, dtype='int64')
+		self.valid = np.zeros(n, dtype='int64')
+		self.hits = np.zeros(n, dtype='int64')
+		self.total = np.zeros(n)
+		# Ring buffer of the values within the window
+		if window is not None:
+			self.buffer = np.full((n, window), np.nan)
+			self.head = np.zeros(n, dtype='int64')
+
+
+	def add(self, symbols):
+		'''
+		Adds the stocks of symbols that are not yet known, e.g. stocks listed
+		after the object was created. They start without observations.
+
+		Args:
+			symbols (list): identifiers of stocks
+		'''
+		fills = {'count': 0, 'valid': 0, 'hits': 0, 'total': 0.0}
+		if self.window is not None:
+			fills.update(buffer=np.nan, head=0)
+		grow(self, symbols, fills)
+
+
+	def update(self, symbols, values):
+		'''
+		Adds one observation for each of the given stocks.
+
+		Args:
+			symbols (list): identifiers of the observed stocks, each at most
+				once
+			values (np.array): observed values in the same order
+		'''
+		slots = locate(self.symbols, symbols)
+		values = np.asarray(values, dtype='float64')
+		# Remove the values leaving the window
+		if self.window is not None:
+			head = self.head[slots]
+			self.remove(slots, self.buffer[slots, head],
+						self.count[slots] >= self.window)
+			self.buffer[slots, head] = values
+			self.head[slots] = (head + 1) % self.window
+		# Add the new values
+		self.count[slots] += 1
+		known = ~np.isnan(values)
+		self.valid[slots] += known
+		self.hits[slots] += values > 0
+		self.total[slots] += np.where(known, values, 0.0)
+
+
+	def remove(self, slots, values, mask):
+		'''
+		Removes the observations values of the stocks at slots where mask is
+		set.
+		'''
+		known = ~np.isnan(values)
+		self.count[slots] -= mask
+		self.valid[slots] -= known
+		self.hits[slots] -= values > 0
+		self.total[slots] -= np.where(known, values, 0.0)
+
+
+	def mean(self):
+		'''
+		Returns the mean of the observed values per stock as pd.Series.
+		'''
+		with np.errstate(invalid='ignore', divide='ignore'):
+			return pd.Series(self.total / self.valid, index=self.symbols)
+
+
+	def hit_rate(self, per_window=False):
+		'''
+		Returns the share of positive observations per stock as pd.Series.
+
+		Args:
+			per_window (boolean): if set, the number of positive observations
+				is divided by window instead of the number of observations
+		'''
+		if per_window:
+			count = float(self.window)
+		else:
+			count = self.count
+		with np.errstate(invalid='ignore', divide='ignore'):
+			return pd.Series(self.hits / count, index=self.symbols)
+
+
+#===============================================================================
+# Class for incremental linear regressions
+#===============================================================================
+
+class RollingOLS:
+	'''
+	Linear regressions of one target on several regressors, one regression
+	per stock, over the last window observations of each stock or over all
+	observations if window is None. Only the normal equations X'X and X'y
+	of every stock are kept and updated with each new observation, so
+	refitting all stocks every day costs O(stocks) instead of a regression
+	over the whole history per stock and day.
+
+	Observations with NaN in the target or a regressor are skipped.
+	'''
+
+	def __init__(self, symbols, n_regressors, window=None, intercept=True):
+		'''
+		Constructor of the RollingOLS class
+
+		Args:
+			symbols (list): identifiers of all stocks
+			n_regressors (integer): number of regressors
+			window (integer): number of observations per stock taken into
+				account, all observations if set to None
+			intercept (boolean): if set, a constant regressor is added
+		'''
+		# Mapping of stocks to positions in the arrays
+		self.symbols = pd.Index(symbols)
+		self.window = window
+		self.intercept = intercept
+		n = len(self.symbols)
+		k = n_regressors + int(intercept)
+		# Normal equations and number of observations per stock
+		self.xtx = np.zeros((n, k, k))
+		self.xty = np.zeros((n, k))
+		self.count = np.zeros(n, dtype='int64')
+		# Regressors of the previous observation of every stock, see step
+		self.last = np.full((n, n_regressors), np.nan)
+		# Ring buffer of the observations within the window
+		if window is not None:
+			self.buffer_x = np.zeros((n, window, k))
+			self.buffer_y = np.zeros((n, window))
+			self.head = np.zeros(n, dtype='int64')
+
+
+	def add(self, symbols):
+		'''
+		Adds the stocks of symbols that are not yet known, e.g. stocks listed
+		after the object was created. They start without observations.
+
+		Args:
+			symbols (list): identifiers of stocks
+		'''
+		fills = {'xtx': 0.0, 'xty': 0.0, 'count': 0, 'last': np.nan}
+		if self.window is not None:
+			fills.update(buffer_x=0.0, buffer_y=0.0, head=0)
+		grow(self, symbols, fills)
+
+
+	def design(self, x):
+		'''
+		Returns the rows of regressors x including the constant regressor.
+		'''
+		x = np.asarray(x, dtype='float64').reshape(len(x), -1)
+		if self.intercept:
+			x = np.hstack([np.ones((len(x), 1)), x])
+		return x
+
+
+	def update(self, symbols, x, y):
+		'''
+		Adds one observation for each of the given stocks.
+
+		Args:
+			symbols (list): identifiers of the observed stocks, each at most
+				once
+			x (np.array): regressors, one row per stock
+			y (np.array): target values in the same order
+		'''
+		slots = locate(self.symbols, symbols)
+		x = self.design(x)
+		y = np.asarray(y, dtype='float64')
+		# Skip incomplete observations
+		valid = np.isfinite(y) & np.isfinite(x).all(axis=1)
+		slots, x, y = slots[valid], x[valid], y[valid]
+		# Remove the observations leaving the window
+		if self.window is not None:
+			head = self.head[slots]
+			full = self.count[slots] >= self.window
+			old_x = self.buffer_x[slots, head] * full[:, None]
+			old_y = self.buffer_y[slots, head] * full
+			self.xtx[slots] -= np.einsum('ij,ik->ijk', old_x, old_x)
+			self.xty[slots] -= old_x * old_y[:, None]
+			self.count[slots] -= full
+			self.buffer_x[slots, head] = x
+			self.buffer_y[slots, head] = y
+			self.head[slots] = (head + 1) % self.window
+		# Add the new observations
+		self.xtx[slots] += np.einsum('ij,ik->ijk', x, x)
+		self.xty[slots] += x * y[:, None]
+		self.count[slots] += 1
+
+
+	def coef(self, symbols=None):
+		'''
+		Returns the regression coefficients of the given stocks, the constant
+		first if intercept is set. Stocks with fewer observations than
+		coefficients have NaN coefficients.
+
+		Args:
+			symbols (list): identifiers of the stocks, all if None
+
+		Returns:
+			np.array with one row per stock
+		'''
+		if symbols is None:
+			slots = np.arange(len(self.symbols))
+		else:
+			slots = locate(self.symbols, symbols)
+		# Least squares solution, also for collinear regressors
+		coef = np.einsum('ijk,ik->ij', np.linalg.pinv(self.xtx[slots]),
+						self.xty[slots])
+		coef[self.count[slots] < coef.shape[1]] = np.nan
+		return coef
+
+
+	def predict(self, symbols, x):
+		'''
+		Returns the predicted targets of the given stocks.
+
+		Args:
+			symbols (list): identifiers of the stocks
+			x (np.array): regressors, one row per stock
+
+		Returns:
+			np.array with one prediction per stock
+		'''
+		return (self.design(x) * self.coef(symbols)).sum(axis=1)
+
+
+	def step(self, symbols, x, y):
+		'''
+		Processes one day of observations for predicting targets one
+		observation ahead. First the target y of every stock is predicted
+		from the regressors of its previous observation, then the pair of
+		these regressors and y is added and x is kept for the next step.
+		Predictions therefore only use targets known before.
+
+		Args:
+			symbols (list): identifiers of the observed stocks, each at most
+				once
+			x (np.array): regressors of the day, one row per stock
+			y (np.array): target values of the day in the same order
+
+		Returns:
+			np.array with the prediction of y made before the day
+		'''
+		slots = locate(self.symbols, symbols)
+		previous = self.last[slots]
+		prediction = self.predict(symbols, previous)
+		self.update(symbols, previous, y)
+		self.last[slots] = np.asarray(x, dtype='float64')
+		return prediction
+
+
+def next_day_predictions(regressors, target, window=None, intercept=True):
+	'''
+	Predicts the target of every stock and day from the regressors of the
+	previous trading day of the stock, refitting a RollingOLS every day.
+
+	Args:
+		regressors (list): dates x symbols pd.DataFrames, one per regressor,
+			e.g. matrices of a backtest.PriceMatrices object
+		target (pd.DataFrame): dates x symbols matrix of the target. A stock
+			is observed on the days its target or a regressor is known.
+		window, intercept: see RollingOLS
+
+	Returns:
+		pd.DataFrame like target with the prediction made before each day
+	'''
+	regressors = [matrix.reindex_like(target).values for matrix in regressors]
+	x = np.stack(regressors, axis=2)
+	y = target.values
+	model = RollingOLS(target.columns, len(regressors), window, intercept)
+	predictions = np.full(y.shape, np.nan)
+	for i in range(len(y)):
+		traded = np.flatnonzero(np.isfinite(y[i])
+								| np.isfinite(x[i]).any(axis=1))
+		symbols = target.columns[traded]
+		predictions[i, traded] = model.step(symbols, x[i, traded], y[i, traded])
+	return pd.DataFrame(predictions, index=target.index,
+						columns=target.columns)
@@ -1,6 +1,9 @@
 # Import external packages
+import numpy as np
 import pandas as pd
 import random as rd
+# Local imports
+import stats
 
 #===============================================================================
 # Module containing strategies
@@ -28,28 +31,31 @@ def inter_day_even(data, depot, time, **kwargs):
 	Args:
 		data (pd.DataFrame: the financial data on which calculations are
 			to be performed.
-		depot (Depot object): depot for the strategy 
+		depot (Depot object): depot for the strategy, also a
+			depot.DepotArray
 		time (pd.timestep): point in time the strategy is applied
+		kwargs: include market (market.MarketContext of the current day)
+
+	All orders of the day are submitted at once, see Depot.buy_many.
 	'''
 	# Get list of available stocks
 	available = data.index.levels[0]
 	# Calculate amount of money available per purchase
 	bank_per_stock = depot.capital / len(available) - depot.fees
-	# Purchase of stocks and monetization
-	for stock in available:
-		if time in data.loc[stock].index:
-			# Get previous day closing price
-			prev_close_price = data.loc[stock].shift(-1).loc[time]['Close']
-			# Only if the previous data exists purchase
-			if not pd.np.isnan(prev_close_price):
-				# Determine number of stocks that can be bought.
-				n_stocks = max(int(bank_per_stock / prev_close_price), 0)
-				# Buy n_stocks at previous day closing price
-				depot.buy(stock=stock, price=prev_close_price, quant=n_stocks)
-				# Current opening price
-				cur_open_price = data.loc[stock,time]['Open']
-				# Sell those stocks at current open price
-				depot.sell(stock=stock, price=cur_open_price, quant=n_stocks)
+	# Stocks traded today with a previous day closing price
+	market = kwargs['market']
+	stocks = [stock for stock in available if market.traded(stock)
+				and not np.isnan(market.prev_close(stock))]
+	if not stocks:
+		return
+	prev_close_prices = np.array([market.prev_close(x) for x in stocks])
+	cur_open_prices = np.array([market.open(x) for x in stocks])
+	# Determine number of stocks that can be bought (per account)
+	n_stocks = np.maximum(np.floor(np.multiply.outer(bank_per_stock,
+											1.0 / prev_close_prices)), 0)
+	# Buy at previous day closing price, sell at current open price
+	depot.buy_many(stocks, prev_close_prices, n_stocks)
+	depot.sell_many(stocks, cur_open_prices, n_stocks)
 
 
 def inter_day_greedy(data, depot, time, **kwargs):
@@ -64,39 +70,66 @@ def inter_day_greedy(data, depot, time, **kwargs):
 			to be performed.
 		depot (Depot object): depot for the strategy 
 		time (pd.timestep): point in time the strategy is applied
-		kwargs: include t_len (in trading days)
+		kwargs: include t_len (in trading days), bar (rows of the current
+			day), state (dict kept across days), market
+			(market.MarketContext of the current day), universe
+			(universe.Universe of the data) and optionally index (name of
+			an index membership the stock has to be in)
+
+	The counts are kept in a stats.RollingStats object in state and updated
+	with the current day only, so each day costs O(stocks). Only stocks
+	tradable at time are chosen.
 
 	ATTENTION: THIS FUNCTION IS ONLY A ROUGH APPROXIMATION
-		* NO CHECK IF THE STOCK WAS AVAILABLE AT TIME
 		* NEEDS TO BE TESTED FOR CORRECTNESS 
 	'''	
 	# Get list of available stocks
 	available = data.index.levels[0]
+	field = 'Previous_Day_1'
 	# Count number of times a stock had positive interday performance
-	p_inter = pd.DataFrame(index=available)
-	# Define counting/frequency function
-	def p_pos(x, t_len, field='Previous_Day_1'):
-		return sum([y > 0 for y in x.iloc[0:t_len][field]])/float(t_len)
-	# Apply counting to given data
-	p_inter['p_pos'] =  data.groupby(level='Symbol')\
-				.apply(lambda x: p_pos(x, kwargs['t_len'])).values
-	# Chose stock based on passed data
-	chosen_stock = p_inter.idxmax()[0]
+	state = kwargs['state']
+	if 'p_pos' not in state:
+		# Start counting with all days known so far
+		state['p_pos'] = stats.RollingStats(available, window=kwargs['t_len'])
+		for _, day in data.groupby(level='Date', sort=True):
+			state['p_pos'].update(day.index.get_level_values('Symbol'),
+								day[field].values)
+	else:
+		# Only the current day is new, stocks may have been listed since
+		bar = kwargs['bar']
+		symbols = bar.index.get_level_values('Symbol')
+		state['p_pos'].add(symbols)
+		state['p_pos'].update(symbols, bar[field].values)
+	# Frequency within the last t_len trading days of each stock
+	p_inter = pd.DataFrame({'p_pos': state['p_pos'].hit_rate(per_window=True)})
+	# Chose stock based on passed data (first one with highest frequency
+	# among the stocks tradable at time)
+	universe = kwargs['universe']
+	tradable = universe.mask(time, ('listed', 'traded'), kwargs.get('index'))
+	if not tradable.any():
+		return p_inter
+	frequency = p_inter['p_pos'].reindex(universe.symbols).values
+	chosen_stock = universe.symbols[np.argmax(np.where(tradable, frequency,
+														-1.0))]
 	# Ensure stock is traded on given date
-	if time in data.loc[chosen_stock].index:
+	market = kwargs['market']
+	if market.traded(chosen_stock):
 		# Get previous day closing price
-		prev_close_price = data.loc[chosen_stock].shift(-1).loc[time]['Close']
+		prev_close_price = market.prev_close(chosen_stock)
 		# Only if the previous data exists purchase
-		if not pd.np.isnan(prev_close_price):
+		if not np.isnan(prev_close_price):
 			# Buy n_stocks at previous day closing price
 			depot.buy(stock=chosen_stock, price=prev_close_price)
 			# Current opening price
-			cur_open_price = data.loc[chosen_stock,time]['Open']
+			cur_open_price = market.open(chosen_stock)
 			# Sell those stocks at current open price
 			depot.sell(stock=chosen_stock, price=cur_open_price)
 	# Only for some data exploration purposes
 	return p_inter
 
+# Features read by inter_day_greedy, computed by the simulator beforehand
+inter_day_greedy.features = ['Previous_Day_1']
+
 
 def inter_day_random(data, depot, time, **kwargs):
 	'''
@@ -108,20 +141,154 @@ def inter_day_random(data, depot, time, **kwargs):
 			to be performed.
 		depot (Depot object): depot for the strategy 
 		time (pd.timestep): point in time the strategy is applied
+		kwargs: include market (market.MarketContext of the current day)
 	'''	
 	# Get list of available stocks
 	available = data.index.levels[0]
 	# Chose stock based on passed data
 	chosen_stock = rd.choice(available)
 	# Ensure stock is traded on given date
-	if time in data.loc[chosen_stock].index:
+	market = kwargs['market']
+	if market.traded(chosen_stock):
 		# Get previous day closing price
-		prev_close_price = data.loc[chosen_stock].shift(-1).loc[time]['Close']
+		prev_close_price = market.prev_close(chosen_stock)
 		# Only if the previous data exists purchase
-		if not pd.np.isnan(prev_close_price):
+		if not np.isnan(prev_close_price):
 			# Buy n_stocks at previous day closing price
 			depot.buy(stock=chosen_stock, price=prev_close_price)
 			# Current opening price
-			cur_open_price = data.loc[chosen_stock,time]['Open']
+			cur_open_price = market.open(chosen_stock)
 			# Sell those stocks at current open price
-			depot.sell(stock=chosen_stock, price=cur_open_price)
\ No newline at end of file
+			depot.sell(stock=chosen_stock, price=cur_open_price)
+
+
+def inter_day_regression(data, depot, time, **kwargs):
+	'''
+	Buy at closing price of previous day sell at opening of current day.
+	Invest all money into the stock with the highest predicted relative inter
+	day performance, if it is positive. The performance is predicted by a
+	linear regression per stock of Previous_Day_Rel_1 on REGRESSORS of the
+	previous trading day of the stock, refitted every day.
+
+	Args:
+		data (pd.DataFrame: the financial data on which calculations are
+			to be performed.
+		depot (Depot object): depot for the strategy
+		time (pd.timestep): point in time the strategy is applied
+		kwargs: include t_len (observations per regression, all if not
+			given), bar (rows of the current day), state (dict kept across
+			days) and market (market.MarketContext of the current day)
+
+	The normal equations are kept in a stats.RollingOLS object in state.
+	The prediction for the current day only uses performances known before
+	the day, the current one is added afterwards.
+	'''
+	state = kwargs['state']
+	bar = kwargs['bar']
+	if 'ols' not in state:
+		# Fit on all days known before the current one
+		state['ols'] = stats.RollingOLS(data.index.levels[0], len(REGRESSORS),
+										window=kwargs.get('t_len'))
+		for date, day in data.groupby(level='Date', sort=True):
+			if date < time:
+				state['ols'].step(day.index.get_level_values('Symbol'),
+								day[REGRESSORS].values,
+								day['Previous_Day_Rel_1'].values)
+	# Predict the current day, then learn from it, stocks may have been
+	# listed since the regressions were created
+	symbols = bar.index.get_level_values('Symbol')
+	state['ols'].add(symbols)
+	predicted = state['ols'].step(symbols, bar[REGRESSORS].values,
+								bar['Previous_Day_Rel_1'].values)
+	if not np.isfinite(predicted).any():
+		return
+	best = np.nanargmax(predicted)
+	chosen_stock = symbols[best]
+	market = kwargs['market']
+	# Only trade on an expected gain
+	if predicted[best] > 0 and market.traded(chosen_stock):
+		prev_close_price = market.prev_close(chosen_stock)
+		if not np.isnan(prev_close_price):
+			# Buy at previous day closing price, sell at current opening
+			depot.buy(stock=chosen_stock, price=prev_close_price)
+			depot.sell(stock=chosen_stock, price=market.open(chosen_stock))
+
+# Regressors of inter_day_regression, as in the model of test_script
+REGRESSORS = ['Open', 'High', 'Low', 'Close', 'Previous_Day_Rel_1',
+			'Previous_Day_Rel_2', 'Previous_Day_Rel_3']
+
+# Features read by inter_day_regression
+inter_day_regression.features = ['Previous_Day_Rel_1', 'Previous_Day_Rel_2',
+								'Previous_Day_Rel_3']
+
+#===============================================================================
+# Strategies returning weight matrices for the backtest.VectorSimulator
+#===============================================================================
+
+def inter_day_even_weights(prices, **kwargs):
+	'''
+	Weight matrix version of inter_day_even. Uniformly distribute money for
+	all stocks.
+
+	Args:
+		prices (PriceMatrices): price matrices of the simulated data
+	'''
+	# Same share for every stock on every day
+	close = prices['Close']
+	return pd.DataFrame(1.0 / len(close.columns), index=close.index,
+						columns=close.columns)
+
+
+def inter_day_greedy_weights(prices, **kwargs):
+	'''
+	Weight matrix version of inter_day_greedy. Invest all money into the stock
+	which had most often a positive Previous_Day_1 in its last t_len trading
+	days.
+
+	Args:
+		prices (PriceMatrices): price matrices of the simulated data
+		kwargs: include t_len (in trading days) and optionally index (name
+			of an index membership the stock has to be in)
+	'''
+	t_len = kwargs['t_len']
+	# Positive inter day performance on the days each stock was traded
+	positive = (prices['Previous_Day_1'] > 0).astype('float64')\
+				.where(prices['Close'].notnull())
+	# Count over the last t_len trading days of each stock, kept until the
+	# stock is traded again
+	p_pos = positive.apply(lambda x: x.dropna().rolling(t_len, min_periods=1)
+							.sum()).reindex(positive.index).ffill()\
+							.fillna(0.0) / float(t_len)
+	# All money into the first stock with the highest frequency among the
+	# stocks tradable on the day, as in inter_day_greedy
+	universe = prices.finance.universe()
+	tradable = universe.matrix('listed') & universe.matrix('traded')
+	if kwargs.get('index'):
+		tradable &= universe.matrix(kwargs['index'])
+	tradable = tradable.reindex(index=p_pos.index, columns=p_pos.columns,
+								fill_value=False)
+	chosen = np.argmax(np.where(tradable.values, p_pos.values, -1.0), axis=1)
+	weights = np.zeros(p_pos.shape)
+	# Nothing is invested on days without a tradable stock
+	weights[np.arange(len(chosen)), chosen] = tradable.values.any(axis=1)
+	return pd.DataFrame(weights, index=p_pos.index, columns=p_pos.columns)
+
+# Features read by inter_day_greedy_weights
+inter_day_greedy_weights.features = ['Previous_Day_1']
+
+#===============================================================================
+# Randomized strategies for the montecarlo.MonteCarloSimulator
+#===============================================================================
+
+def inter_day_random_paths(prices, uniforms, **kwargs):
+	'''
+	Path version of inter_day_random. Invest all money into a random stock,
+	drawn independently for every day and path.
+
+	Args:
+		prices (PriceMatrices): price matrices of the simulated data
+		uniforms (np.array): dates x paths uniform random numbers
+	'''
+	# Map the random numbers uniformly to the columns of the price matrices
+	n_stocks = len(prices['Close'].columns)
+	return np.minimum((uniforms * n_stocks).astype('int64'), n_stocks - 1)
@@ -0,0 +1,177 @@
+# External imports
+import pandas as pd
+from collections import deque
+# Local imports
+import cache as ch
+import features as ft
+import market as mk
+import universe as un
+
+#===============================================================================
+# Sources of bars
+#===============================================================================
+# A bar is a pd.DataFrame with the rows of all stocks on one date, with
+# columns Symbol, Date and the price columns. Sources are generators yielding
+# bars in ascending date order.
+
+def frame_bars(data):
+	'''
+	Yields the bars of an in-memory (Symbol, Date) panel.
+
+	Args:
+		data (pd.DataFrame): panel with a (Symbol, Date) MultiIndex
+	'''
+	for _, bar in data.reset_index().groupby('Date', sort=True):
+		yield bar
+
+
+def csv_bars(path, chunksize=100000):
+	'''
+	Yields the bars of a csv file with columns Symbol, Date and the price
+	columns, sorted by date. The file is read in chunks, so only chunksize
+	rows are in memory at a time.
+
+	Args:
+		path (string): csv file to read
+		chunksize (integer): rows read at once
+	'''
+	rest = None
+	for chunk in pd.read_csv(path, chunksize=chunksize):
+		chunk['Date'] = pd.to_datetime(chunk['Date'])
+		if rest is not None:
+			chunk = pd.concat([rest, chunk], ignore_index=True)
+		# The last date may continue in the next chunk
+		last = chunk['Date'].iloc[-1]
+		rest = chunk[chunk['Date'] == last]
+		for _, bar in chunk[chunk['Date'] < last].groupby('Date', sort=True):
+			yield bar
+	if rest is not None and len(rest):
+		yield rest
+
+
+def provider_bars(provider, name_list, start_date, end_date, chunk='30D'):
+	'''
+	Replays the data of a provider bar by bar, e.g. a providers.CSVProvider as
+	local stand-in for a live feed. Data is requested in date ranges of
+	length chunk, so only one range is in memory at a time.
+
+	Args:
+		provider (DataProvider): source of the data
+		name_list (list): symbols of the stocks to replay
+		start_date: first day of the replay
+		end_date: last day of the replay
+		chunk (string): length of the requested date ranges
+	'''
+	start = pd.to_datetime(start_date)
+	end_date = pd.to_datetime(end_date)
+	while start <= end_date:
+		end = min(start + pd.Timedelta(chunk) - ch.DAY, end_date)
+		frames = [provider.fetch(name, start, end) for name in name_list]
+		for bar in frame_bars(pd.concat(frames, ignore_index=True)
+								.set_index(['Symbol', 'Date'])):
+			yield bar
+		start = end + ch.DAY
+
+#===============================================================================
+# Class for simulating strategies on streams of bars
+#===============================================================================
+
+class StreamSimulator:
+	'''
+	Simulator consuming bars from a source instead of a complete panel. Only
+	the last lookback bars are kept, so memory use does not grow with the
+	length of the history. Strategies are called like in the Simulator, with
+	data being the (Symbol, Date) panel of the lookback window including the
+	features the strategy reads, newest date first. The universe passed to
+	the strategy covers the lookback window only.
+	'''
+
+	def __init__(self, source, depot, strategy, lookback=20, record=False):
+		'''
+		Constructor of the StreamSimulator class
+
+		Args:
+			source (iterable): bars in ascending date order, see frame_bars,
+				csv_bars and provider_bars
+			depot (Depot object): contains the starting parameters for the
+				simulation.
+			strategy (function): the strategy used for buying and selling,
+				see Simulator. Features listed in its attribute features
+				are computed over the lookback window.
+			lookback (integer): number of bars passed to the strategy. The
+				stocks available to the strategy are those in these bars.
+			record (boolean): if set, the capital after every bar is kept,
+				which grows with the length of the history. Otherwise only
+				the last capital is stored and memory use stays constant.
+		'''
+		# Copy references to parameters to class variables
+		self.source = source
+		self.depot = depot
+		self.strategy = strategy
+		self.window = deque(maxlen=lookback)
+		self.record = record
+		# State the strategy keeps across the simulated days
+		self.state = {}
+		# Prices of the current bar for the strategy
+		self.market = mk.MarketContext()
+		# Capital after each bar
+		self.times = []
+		self.capital = []
+
+
+	def panel(self):
+		'''
+		Builds the (Symbol, Date) panel of the lookback window, newest date
+		first and with the features read by the strategy.
+		'''
+		data = pd.concat(self.window, ignore_index=True)\
+				.set_index(['Symbol', 'Date'])
+		# Compute the features over the window
+		names = getattr(self.strategy, 'features', [])
+		if names:
+			enriched = ft.compute(data, names)
+			for name in names:
+				data[name] = enriched[name].values
+		# Same order as the point in time view, newest date first
+		return data.sort_index(level=['Date', 'Symbol'],
+								ascending=[False, True])
+
+
+	def run(self, **kwargs):
+		'''
+		Function to run the simulation of a strategy over all bars of the
+		source
+
+		Returns:
+			pd.DataFrame with the capital after each bar, or only after the
+			last bar if record is not set. Empty if the source has no bars.
+		'''
+		for bar in self.source:
+			time = bar['Date'].iloc[0]
+			self.window.append(bar)
+			self.market.push(time, bar['Symbol'].values, bar['Open'].values,
+							bar['Close'].values, un.rows_traded(bar))
+			# Pass the window and the rows of the current bar
+			data = self.panel()
+			day = data.iloc[:len(bar)]
+			self.depot.time = time
+			self.strategy(data=data, depot=self.depot, time=time, bar=day,
+						market=self.market, universe=un.Universe(data),
+						state=self.state, **kwargs)
+			# Save the time development of the capital
+			if self.record or not self.times:
+				self.times.append(time)
+				self.capital.append(self.depot.capital)
+			else:
+				self.times[0] = time
+				self.capital[0] = self.depot.capital
+		# Nothing to monetize without bars
+		if not self.times:
+			return pd.DataFrame({'capital': self.capital}, index=self.times)
+		# At end of simulation monetize all your assets at last closing price
+		self.depot.monetize(pd.Series(self.market.last_close[:len(
+									self.market.symbols)],
+									index=self.market.symbols))
+		self.capital[-1] = self.depot.capital
+		# For convenience return the result object
+		return pd.DataFrame({'capital': self.capital}, index=self.times)
@@ -0,0 +1,273 @@
+# External imports
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+# Local imports
+import backtest as bt
+import depot as dp
+import financedata as fd
+import simulator as sim
+
+#===============================================================================
+# Global module variables
+#===============================================================================
+
+# Default parameters of a simulation in a sweep
+DEFAULTS = {'capital': 1000.0, 'fees': 5.0, 'start_time': None,
+			'engine': 'event'}
+
+# Panel attached in a worker process, set by attach_worker
+WORKER = {}
+
+# Price matrices read by the simulators, shared with the panel
+MATRICES = ['Open', 'Close', 'Prev_Close']
+
+#===============================================================================
+# Class for sharing finance data between processes
+#===============================================================================
+
+class SharedPanel:
+	'''
+	Places a (Symbol, Date) panel in shared memory. The numeric columns, the
+	symbol codes and the dates are stored in shared memory blocks, worker
+	processes attach to them by name and build a FinanceData object on top
+	of the shared arrays without copying or pickling the data.
+
+	The rows are shared in the order of the point in time view, newest date
+	first, so the view of a worker slices the shared rows instead of copying
+	them. The price matrices of MATRICES, read by the simulators, are shared
+	as further blocks. Other matrices, e.g. of features read by vectorized
+	strategies, are built by every worker once and reused by its following
+	simulations.
+	'''
+
+	def __init__(self, finance_data):
+		'''
+		Constructor of the SharedPanel class, copies the data of finance_data
+		into new shared memory blocks. The creating process owns the blocks
+		and has to call close.
+
+		Args:
+			finance_data (FinanceData): data to share, including all feature
+				columns computed so far
+		'''
+		# Rows in the order of the point in time view
+		data = finance_data.view().data
+		index = data.index
+		arrays = {
+			'values': data.values.astype('float64'),
+			'codes': np.asarray(index.codes[index.names.index('Symbol')],
+								dtype='int32'),
+			'dates': index.get_level_values('Date').values\
+						.astype('datetime64[ns]')}
+		prices = finance_data.matrices()
+		for name in MATRICES:
+			arrays[name] = prices[name].values.astype('float64')
+		# Everything but the arrays is small and sent to the workers
+		symbols = index.levels[index.names.index('Symbol')]
+		self.spec = {'columns': list(data.columns),
+					'symbols': list(symbols),
+					'start_date': finance_data.start_date,
+					'end_date': finance_data.end_date,
+					'matrix_dates': prices['Close'].index,
+					'matrix_symbols': list(prices['Close'].columns),
+					'arrays': {}}
+		self.blocks = []
+		for name, values in arrays.items():
+			block = shared_memory.SharedMemory(create=True,
+											size=max(1, values.nbytes))
+			np.ndarray(values.shape, values.dtype, block.buf)[...] = values
+			self.blocks.append(block)
+			self.spec['arrays'][name] = (block.name, values.shape,
+										values.dtype.str)
+
+
+	def close(self):
+		'''
+		Releases the shared memory blocks.
+		'''
+		for block in self.blocks:
+			block.close()
+			block.unlink()
+		self.blocks = []
+
+
+	@staticmethod
+	def attach(spec):
+		'''
+		Builds a FinanceData object on top of shared memory blocks.
+
+		Args:
+			spec (dict): SharedPanel.spec of the creating process
+
+		Returns:
+			tuple of the FinanceData object and the attached blocks, which
+			have to be kept referenced as long as the data is used
+		'''
+		arrays = {}
+		blocks = []
+		for name, (block_name, shape, dtype) in spec['arrays'].items():
+			block = attach_block(block_name)
+			values = np.ndarray(shape, dtype, block.buf)
+			values.flags.writeable = False
+			arrays[name] = values
+			blocks.append(block)
+		# Build the panel without copying the values
+		dates = np.unique(arrays['dates'])
+		index = pd.MultiIndex(levels=[spec['symbols'],
+									pd.DatetimeIndex(dates)],
+							codes=[arrays['codes'],
+									np.searchsorted(dates, arrays['dates'])],
+							names=['Symbol', 'Date'])
+		data = pd.DataFrame(arrays['values'], index=index,
+							columns=spec['columns'], copy=False)
+		finance = fd.FinanceData(name_list=spec['symbols'],
+								start_date=spec['start_date'],
+								end_date=spec['end_date'], data=data)
+		# Price matrices on top of the shared blocks
+		prices = finance.matrices()
+		for name in MATRICES:
+			prices.matrices[name] = pd.DataFrame(
+							arrays[name], index=spec['matrix_dates'],
+							columns=pd.Index(spec['matrix_symbols'],
+											name='Symbol'), copy=False)
+		return finance, blocks
+
+
+def since(finance, start_date, end_date=None):
+	'''
+	Returns the rows of an attached panel from start_date on as FinanceData,
+	see SharedPanel. Rows and shared price matrices are sliced, not copied.
+
+	Args:
+		finance (FinanceData): data built by SharedPanel.attach
+		start_date (pd.Timestamp): first day of the returned data
+		end_date (pd.Timestamp): last day recorded in the returned data, the
+			data itself is not cut, last day of finance if None
+	'''
+	dates = finance.data.index.get_level_values('Date').values
+	# Newest date first, the rows from start_date on are at the beginning
+	rows = len(dates) - np.searchsorted(dates[::-1],
+										np.datetime64(start_date), 'left')
+	window = fd.FinanceData(name_list=finance.name_list,
+							start_date=start_date,
+							end_date=end_date or finance.end_date,
+							data=finance.data.iloc[:rows])
+	prices = window.matrices()
+	for name in MATRICES:
+		matrix = finance.matrices()[name]
+		prices.matrices[name] = matrix.iloc[
+						matrix.index.searchsorted(start_date):]
+	return window
+
+
+def attach_block(name):
+	'''
+	Attaches to an existing shared memory block. Worker processes share the
+	resource tracker of the creating process, which removes the block only
+	after close was called or when all processes have exited.
+
+	Args:
+		name (string): name of the block
+	'''
+	try:
+		return shared_memory.SharedMemory(name=name, track=False)
+	except TypeError:
+		# Python before 3.13 has no track argument
+		return shared_memory.SharedMemory(name=name)
+
+#===============================================================================
+# Non class functions for running sweeps
+#===============================================================================
+
+def grid(**axes):
+	'''
+	Creates the configurations of all combinations of the given values.
+
+	Args:
+		axes: lists of values per parameter, e.g. t_len=[1, 5, 10]
+
+	Returns:
+		list of dicts, one per combination
+	'''
+	names = list(axes)
+	return [dict(zip(names, values))
+			for values in itertools.product(*[axes[name] for name in names])]
+
+
+def attach_worker(spec):
+	'''
+	Initializer of the worker processes, attaches to the shared panel once.
+	'''
+	WORKER['finance'], WORKER['blocks'] = SharedPanel.attach(spec)
+
+
+def run_config(config):
+	'''
+	Runs a single simulation in a worker process on the shared panel, see
+	SharedPanel.
+
+	Args:
+		config (dict): strategy and its keyword arguments plus the parameters
+			in DEFAULTS
+
+	Returns:
+		pd.DataFrame with the capital per date
+	'''
+	config = dict(DEFAULTS, **config)
+	params = {name: config.pop(name)
+				for name in ['strategy', 'capital', 'fees', 'start_time',
+							'engine']}
+	depot = dp.Depot(capital=params['capital'], fees=params['fees'])
+	# Event driven or vectorized simulation of the strategy
+	if params['engine'] == 'vector':
+		simulator = bt.VectorSimulator(WORKER['finance'], depot,
+									params['strategy'], params['start_time'])
+	else:
+		simulator = sim.Simulator(WORKER['finance'], depot,
+								params['strategy'], params['start_time'])
+	return simulator.run(**config).copy()
+
+
+def sweep(finance_data, configs, max_workers=None):
+	'''
+	Runs a simulation for every configuration on a pool of worker processes.
+	The finance data is placed in shared memory once, the features read by
+	the strategies are computed before.
+
+	Args:
+		finance_data (FinanceData): data on which the simulations are run
+		configs (list): dicts with the strategy function under 'strategy',
+			optionally capital, fees, start_time and engine ('event' or
+			'vector', see DEFAULTS) and the keyword arguments of the strategy.
+			See grid for creating them.
+		max_workers (integer): number of processes, all cores if None
+
+	Returns:
+		pd.DataFrame with one row per configuration and date, containing the
+		parameters, Date and the simulated Capital
+	'''
+	# Compute all features the strategies need before sharing the data
+	for config in configs:
+		finance_data.require(getattr(config['strategy'], 'features', []))
+	panel = SharedPanel(finance_data)
+	try:
+		with ProcessPoolExecutor(max_workers=max_workers,
+								initializer=attach_worker,
+								initargs=(panel.spec,)) as pool:
+			results = list(pool.map(run_config, configs))
+	finally:
+		panel.close()
+	# Tidy frame keyed by the parameters
+	frames = []
+	for config, result in zip(configs, results):
+		frame = result.rename(columns={'capital': 'Capital'})\
+				.rename_axis('Date').reset_index()
+		for i, (name, value) in enumerate(dict(DEFAULTS, **config).items()):
+			if name == 'strategy':
+				value = value.__name__
+			frame.insert(i, name, [value] * len(frame))
+		frames.append(frame)
+	return pd.concat(frames, ignore_index=True)
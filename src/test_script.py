@@ -14,11 +14,17 @@ import strategies as strat
 # Define start and end date variables
 START = '2013-11-01'
 END = '2014-11-01'
+# Directory of the local price cache (only missing ranges are downloaded)
+CACHE = 'price_cache'
 
 # Reload for edits in module financedata to take place
 importlib.reload(fd)
 # Load the first three DAX companies to F 
-F = fd.FinanceData(name_list=fd.DAX[:10], start_date=START, end_date=END)
+F = fd.FinanceData(name_list=fd.DAX[:10], start_date=START, end_date=END,
+					cache_dir=CACHE)
+
+# Features are computed on first use, compute all of them for exploration
+#F.enrich_data()
 
 # Build predictor
 #import statsmodels.formula.api as sm
@@ -27,6 +33,10 @@ F = fd.FinanceData(name_list=fd.DAX[:10], start_date=START, end_date=END)
 					#+ Previous_Day_Rel_3",\
 					#data=F.data).fit()
 #result.summary()
+# Refitted every day for all stocks at once, usable in strategies
+#S3 = sim.Simulator(finance_data=F, depot=dp.Depot(capital, fees),
+#				strategy=strat.inter_day_regression)
+#R3 = S3.run(t_len=60)
 
 # Plot relationship of data
 #F.data[['Between_Day_Rel','Within_Day_Rel']].dropna().plot(kind='density',xlim=[-0.02,0.02])
@@ -56,4 +66,30 @@ R0.plot()
 R1.plot()
 R2.plot()
 
+# Or simulate all strategies in one pass over the dates
+#M = sim.MultiSimulator(finance_data=F, runs={
+#	'even': (strat.inter_day_even, dp.Depot(capital=capital, fees=fees)),
+#	'random': (strat.inter_day_random, dp.Depot(capital=capital, fees=fees)),
+#	'greedy': (strat.inter_day_greedy, dp.Depot(capital=capital, fees=fees),
+#				{'t_len': 1})})
+#M.run().plot()
+
+# Find out where the time of a simulation goes
+#import instrument as ins
+#I = ins.Instrument()
+#with I.profile('run.prof'):
+#	sim.Simulator(F, dp.Depot(capital, fees), strat.inter_day_greedy,
+#				instrument=I).run(t_len=1)
+#I.summary()
+
+# Sweep strategy parameters on all cores (needs a __main__ guard on Windows)
+#import sweep as sw
+#R = sw.sweep(F, sw.grid(strategy=[strat.inter_day_greedy], t_len=[1, 5, 10],
+#						fees=[5, 10], capital=[1000, 10000]))
+#R.groupby(['t_len', 'fees', 'capital'])['Capital'].last()
 
+# Walk-forward evaluation on half year training and quarter test periods
+#import walkforward as wf
+#W = wf.walk_forward(F, {'strategy': strat.inter_day_greedy, 't_len': 5},
+#					train=125, test=63)
+#wf.summarize(W)
@@ -0,0 +1,176 @@
+# External imports
+import numpy as np
+import pandas as pd
+
+#===============================================================================
+# Global module variables
+#===============================================================================
+
+# Availability layers built from the data
+LAYERS = ['data', 'traded', 'listed']
+
+#===============================================================================
+# Functions for stock availability
+#===============================================================================
+
+def rows_traded(data):
+	'''
+	Returns whether the stock of each row is traded on the day of the row,
+	the traded layer of the Universe. Simulators and market contexts use it
+	so that all of them agree on the tradable stocks.
+
+	Args:
+		data (pd.DataFrame): rows with Open, Close and optionally Volume
+
+	Returns:
+		np.array of booleans, True if the row has opening and closing prices
+		and, if data has volumes, a positive volume
+	'''
+	valid = np.isfinite(data['Open'].values) \
+			& np.isfinite(data['Close'].values)
+	if 'Volume' in data:
+		valid &= data['Volume'].values > 0
+	return valid
+
+#===============================================================================
+# Class for trading calendars and stock availability
+#===============================================================================
+
+class Universe:
+	'''
+	Trading calendar of a (Symbol, Date) panel and the availability of every
+	stock on every day of the calendar. Availability is kept as bitmaps of
+	dates x symbols packed into bits along the symbols, one per layer:
+
+		data    the panel has a row of the stock on that day
+		traded  the row has opening and closing prices and, if the panel
+				has volumes, a positive volume
+		listed  the day lies between the first and last row of the stock
+
+	Further layers hold the membership of stocks in indices over time, e.g.
+	historical DAX constituents. They are set with add_membership and do not
+	require rebuilding the panel. Queries for a day combine the bitmaps of
+	that day with bitwise and and unpack only the result.
+	'''
+
+	def __init__(self, data, memberships=None):
+		'''
+		Constructor of the Universe class, builds calendar and bitmaps.
+
+		Args:
+			data (pd.DataFrame): panel with a (Symbol, Date) MultiIndex
+			memberships (dict): index memberships by index name, lists of
+				(symbol, start, end) as recorded by add_membership. The
+				dict is shared, memberships added later are recorded in it.
+		'''
+		index = data.index
+		self.symbols = index.levels[index.names.index('Symbol')]
+		dates = index.get_level_values('Date')
+		self.calendar = pd.DatetimeIndex(np.unique(dates.values), name='Date')
+		# Row of every day and column of every stock in the bitmaps
+		d = self.calendar.get_indexer(dates)
+		s = np.asarray(index.codes[index.names.index('Symbol')])
+		shape = (len(self.calendar), len(self.symbols))
+		present = np.zeros(shape, dtype='bool')
+		present[d, s] = True
+		traded = np.zeros(shape, dtype='bool')
+		valid = rows_traded(data)
+		traded[d[valid], s[valid]] = True
+		# Days between the first and the last row of every stock
+		rows = np.arange(shape[0])[:, None]
+		first = np.where(present.any(axis=0), present.argmax(axis=0),
+						shape[0])
+		last = shape[0] - 1 - present[::-1].argmax(axis=0)
+		listed = (rows >= first) & (rows <= last)
+		self.bitmaps = {'data': np.packbits(present, axis=1),
+						'traded': np.packbits(traded, axis=1),
+						'listed': np.packbits(listed, axis=1)}
+		# Index memberships
+		self.memberships = {} if memberships is None else memberships
+		for name, intervals in list(self.memberships.items()):
+			for symbol, start, end in intervals:
+				self.set_membership(name, symbol, start, end)
+
+
+	def position(self, time):
+		'''
+		Returns the row of time in the calendar.
+
+		Args:
+			time (pd.Timestamp): a day of the calendar
+		'''
+		i = self.calendar.searchsorted(time)
+		if i == len(self.calendar) or self.calendar[i] != time:
+			raise KeyError('{} is not a day of the calendar'.format(time))
+		return i
+
+
+	def add_membership(self, index, symbol, start=None, end=None):
+		'''
+		Records that symbol is a member of index from start to end.
+
+		Args:
+			index (string): name of the index, e.g. 'DAX'
+			symbol (string): identifier of the stock
+			start: first day of the membership, since ever if None
+			end: last day of the membership, until today if None
+		'''
+		self.memberships.setdefault(index, []).append((symbol, start, end))
+		self.set_membership(index, symbol, start, end)
+
+
+	def set_membership(self, index, symbol, start, end):
+		'''
+		Sets the bits of a membership in the bitmap of index.
+		'''
+		if index not in self.bitmaps:
+			self.bitmaps[index] = np.zeros_like(self.bitmaps['data'])
+		column = self.symbols.get_loc(symbol)
+		first = 0 if start is None else \
+				self.calendar.searchsorted(pd.to_datetime(start), 'left')
+		last = len(self.calendar) if end is None else \
+				self.calendar.searchsorted(pd.to_datetime(end), 'right')
+		self.bitmaps[index][first:last, column // 8] |= \
+				np.uint8(0x80 >> (column % 8))
+
+
+	def mask(self, time, layers=('traded',), index=None):
+		'''
+		Returns which stocks are available on a day in all given layers.
+
+		Args:
+			time (pd.Timestamp): a day of the calendar
+			layers (list): names of layers, see LAYERS
+			index (string): if set, only members of this index
+
+		Returns:
+			np.array of booleans in the order of self.symbols
+		'''
+		i = self.position(time)
+		bits = self.bitmaps[layers[0]][i]
+		for layer in list(layers[1:]) + ([index] if index else []):
+			bits = bits & self.bitmaps[layer][i]
+		return np.unpackbits(bits, count=len(self.symbols)).astype('bool')
+
+
+	def tradable(self, time, index=None):
+		'''
+		Returns the stocks that are listed and traded on a day.
+
+		Args:
+			time (pd.Timestamp): a day of the calendar
+			index (string): if set, only members of this index
+
+		Returns:
+			pd.Index of symbols
+		'''
+		return self.symbols[self.mask(time, ('listed', 'traded'), index)]
+
+
+	def matrix(self, layer):
+		'''
+		Returns a layer as dates x symbols pd.DataFrame of booleans.
+		'''
+		return pd.DataFrame(np.unpackbits(self.bitmaps[layer], axis=1,
+										count=len(self.symbols)).astype('bool'),
+							index=self.calendar, columns=self.symbols)
@@ -0,0 +1,149 @@
+# External imports
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+# Local imports
+import backtest as bt
+import depot as dp
+import simulator as sim
+import sweep as sw
+
+#===============================================================================
+# Non class functions for walk-forward evaluation
+#===============================================================================
+
+def windows(dates, train, test, step=None, expanding=False):
+	'''
+	Splits trading days into walk-forward windows. Each window consists of a
+	training period followed by an out-of-sample test period.
+
+	Args:
+		dates (list): sorted trading days
+		train (integer): number of trading days of the training periods, for
+			expanding windows the length of the first one
+		test (integer): number of trading days of the test periods
+		step (integer): trading days between the starts of consecutive test
+			periods, test if None
+		expanding (boolean): if set, every training period starts at the
+			first day, otherwise it rolls with the test period
+
+	Returns:
+		list of dicts with train_start, test_start and test_end
+	'''
+	dates = pd.DatetimeIndex(dates)
+	step = step or test
+	result = []
+	for i in range(train, len(dates), step):
+		result.append({'train_start': dates[0 if expanding else i - train],
+						'test_start': dates[i],
+						'test_end': dates[min(i + test, len(dates)) - 1]})
+	return result
+
+
+def run_window(task):
+	'''
+	Runs the test period of one window in a worker process, see
+	sweep.attach_worker. The strategy only sees the data of the window, its
+	state starts empty in every window.
+
+	Args:
+		task (tuple): window (dict, see windows) and configuration (dict,
+			see walk_forward)
+
+	Returns:
+		tuple of the capital per date and the number of transactions, NaN
+		for the vectorized engine, which records no transactions
+	'''
+	window, config = task
+	config = dict(sw.DEFAULTS, **config)
+	params = {name: config.pop(name)
+				for name in ['strategy', 'capital', 'fees', 'start_time',
+							'engine']}
+	finance = sw.WORKER['finance']
+	# Rolling windows hide the data before the training period
+	if finance.data.index.get_level_values('Date').min() \
+			< window['train_start']:
+		finance = sw.since(finance, window['train_start'], window['test_end'])
+	depot = dp.Depot(capital=params['capital'], fees=params['fees'])
+	# Event driven or vectorized simulation of the strategy
+	if params['engine'] == 'vector':
+		simulator = bt.VectorSimulator(finance, depot, params['strategy'],
+									start_time=window['test_start'],
+									end_time=window['test_end'])
+		return simulator.run(**config)['capital'].copy(), np.nan
+	simulator = sim.Simulator(finance, depot, params['strategy'],
+							start_time=window['test_start'],
+							end_time=window['test_end'])
+	return simulator.run(**config)['capital'].copy(), len(depot.ledger)
+
+
+def walk_forward(finance_data, config, train, test, step=None,
+				expanding=False, max_workers=None):
+	'''
+	Evaluates a strategy on walk-forward windows, see windows. The test
+	periods are simulated independently on a pool of worker processes, all
+	attached to the same panel in shared memory, see sweep.SharedPanel.
+
+	Args:
+		finance_data (FinanceData): data on which the simulations are run
+		config (dict): strategy function under 'strategy', optionally capital,
+			fees and engine (see sweep.DEFAULTS) and the keyword arguments
+			of the strategy. The windows determine the simulated days, a
+			start_time raises a ValueError.
+		train, test, step, expanding: see windows
+		max_workers (integer): number of processes, all cores if None
+
+	Returns:
+		pd.DataFrame with one row per window, containing its dates, the
+		number of days, the final capital, return, maximum drawdown and
+		number of transactions
+	'''
+	if config.get('start_time') is not None:
+		raise ValueError('start_time is set by the windows of walk_forward')
+	if config.get('engine', 'event') not in ('event', 'vector'):
+		raise ValueError('Unknown engine: {}'.format(config['engine']))
+	finance_data.require(getattr(config['strategy'], 'features', []))
+	dates = np.unique(finance_data.data.index.get_level_values('Date'))
+	splits = windows(dates, train, test, step, expanding)
+	panel = sw.SharedPanel(finance_data)
+	try:
+		with ProcessPoolExecutor(max_workers=max_workers,
+								initializer=sw.attach_worker,
+								initargs=(panel.spec,)) as pool:
+			results = list(pool.map(run_window,
+									[(window, config) for window in splits]))
+	finally:
+		panel.close()
+	# Metrics of every window
+	capital = float(config.get('capital', sw.DEFAULTS['capital']))
+	rows = []
+	for window, (result, trades) in zip(splits, results):
+		values = result.values.astype('float64')
+		peak = np.maximum.accumulate(np.concatenate([[capital], values]))[1:]
+		rows.append(dict(window, days=len(values), capital=values[-1],
+						max_drawdown=(1.0 - values / peak).max(),
+						trades=trades))
+		rows[-1]['return'] = values[-1] / capital - 1.0
+	return pd.DataFrame(rows).rename_axis('Window')
+
+
+def summarize(results):
+	'''
+	Aggregates the metrics of the windows of walk_forward.
+
+	Args:
+		results (pd.DataFrame): result of walk_forward
+
+	Returns:
+		pd.Series with the number of windows, mean, standard deviation and
+		worst return, the share of windows with positive return, the return
+		of investing window after window and the worst drawdown
+	'''
+	returns = results['return']
+	return pd.Series({'windows': len(results),
+					'mean_return': returns.mean(),
+					'std_return': returns.std(),
+					'worst_return': returns.min(),
+					'positive': (returns > 0).mean(),
+					'compounded_return': (1.0 + returns).prod() - 1.0,
+					'max_drawdown': results['max_drawdown'].max()})
@@ -0,0 +1,39 @@
+# External imports
+import os
+import sys
+import pytest
+
+# The modules of the package are imported by name, like in test_script
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'src'))
+
+# Local imports
+import financedata as fd
+import providers as pv
+
+#===============================================================================
+# Global module variables
+#===============================================================================
+
+# Range of the synthetic test data
+START = '2012-01-02'
+END = '2013-12-31'
+
+#===============================================================================
+# Fixtures
+#===============================================================================
+
+def synthetic(start_date=START, end_date=END, symbols=8, **options):
+	'''
+	Returns FinanceData of synthetic stocks, see providers.SyntheticProvider.
+	'''
+	provider = pv.SyntheticProvider(seed=7, **options)
+	return fd.FinanceData(list(fd.DAX[:symbols]), start_date=start_date,
+						end_date=end_date, provider=provider, max_workers=1)
+
+
+@pytest.fixture
+def finance():
+	'''
+	Synthetic stocks with missing days, late listings and suspensions.
+	'''
+	return synthetic(missing=0.05, gaps=0.8)
@@ -0,0 +1,34 @@
+# External imports
+import numpy as np
+import pandas as pd
+import pytest
+# Local imports
+import analytics as an
+
+
+def test_result_store_appends_and_filters(tmp_path):
+	store = an.ResultStore(str(tmp_path / 'results'))
+	capital = pd.DataFrame({'capital': [1000.0, 1010.0]},
+						index=pd.Index(pd.bdate_range('2012-01-02', periods=2),
+										name='Date'))
+	store.append(capital, t_len=1, start_time=None)
+	store.append(capital * 2, t_len=5,
+				start_time=pd.Timestamp('2012-01-02'))
+	# Parts are read back by a reopened store
+	store = an.ResultStore(str(tmp_path / 'results'))
+	assert len(store) == 4
+	assert store.columns == ['Date', 'capital', 'Part', 't_len', 'start_time']
+	selected = store.read(['capital', 'Part'], t_len=[5])
+	np.testing.assert_array_equal(selected['capital'], [2000.0, 2020.0])
+	assert (selected['Part'] == 1).all()
+	# None selects the missing start times
+	assert (store.read(start_time=None)['t_len'] == 1).all()
+	assert store.read(t_len=2).empty
+
+
+def test_result_store_rejects_objects(tmp_path):
+	store = an.ResultStore(str(tmp_path / 'results'))
+	with pytest.raises(TypeError):
+		store.append(pd.DataFrame({'strategy': [len, None]}))
+	# Nothing is stored by a failed append
+	assert len(store) == 0
@@ -0,0 +1,57 @@
+# External imports
+import pandas as pd
+# Local imports
+import cache as ch
+import financedata as fd
+import providers as pv
+
+
+class CountingProvider(pv.SyntheticProvider):
+	'''
+	Synthetic provider recording the requested ranges.
+	'''
+
+	def __init__(self):
+		pv.SyntheticProvider.__init__(self, seed=1)
+		self.requests = []
+
+
+	def get_history(self, name, start_date, end_date):
+		self.requests.append((pd.to_datetime(start_date),
+							pd.to_datetime(end_date)))
+		return pv.SyntheticProvider.get_history(self, name, start_date,
+												end_date)
+
+
+def load(provider, path, start_date, end_date):
+	return fd.FinanceData(['ADS.DE'], start_date=start_date, end_date=end_date,
+						cache_dir=path, provider=provider, max_workers=1).data
+
+
+def test_cache_fetches_only_missing_ranges(tmp_path):
+	provider = CountingProvider()
+	load(provider, str(tmp_path), '2014-01-01', '2014-03-01')
+	load(provider, str(tmp_path), '2014-02-01', '2014-04-01')
+	assert provider.requests[1] == (pd.Timestamp('2014-03-02'),
+									pd.Timestamp('2014-04-01'))
+	load(provider, str(tmp_path), '2014-01-15', '2014-03-15')
+	assert len(provider.requests) == 2
+
+
+def test_cache_fills_gaps_between_disjoint_ranges(tmp_path):
+	provider = CountingProvider()
+	load(provider, str(tmp_path), '2014-01-01', '2014-03-01')
+	load(provider, str(tmp_path), '2015-01-01', '2015-03-01')
+	cached = load(provider, str(tmp_path), '2014-01-01', '2015-03-01')
+	expected = load(pv.SyntheticProvider(seed=1), None, '2014-01-01',
+					'2015-03-01')
+	pd.testing.assert_frame_equal(cached, expected)
+	assert len(provider.requests) == 2
+
+
+def test_cache_does_not_cover_future_ranges(tmp_path):
+	cache = ch.PriceCache(str(tmp_path))
+	today = pd.Timestamp.today().normalize()
+	cache.write('ADS.DE', pd.DataFrame(columns=['Date'] + ch.COLUMNS),
+				today + 10 * ch.DAY, today + 20 * ch.DAY)
+	assert cache.coverage('ADS.DE') is None
@@ -0,0 +1,79 @@
+# External imports
+import numpy as np
+import pandas as pd
+# Local imports
+import depot as dp
+
+
+# Orders of the tests, the capital does not suffice for all of them
+STOCKS = ['A', 'B', 'C', 'A', 'D']
+PRICES = np.array([10.0, 25.5, 3.2, 11.0, 40.0])
+QUANTS = np.array([20.0, np.nan, 100.0, 30.0, 50.0])
+
+
+def sequential(stocks, prices, quants):
+	'''
+	Depot with the orders applied by buy one by one.
+	'''
+	depot = dp.Depot(capital=1000.0, fees=5.0)
+	for stock, price, quant in zip(stocks, prices, quants):
+		depot.buy(stock, price, None if np.isnan(quant) else quant)
+	return depot
+
+
+def assert_same(depot, expected):
+	assert np.isclose(depot.capital, expected.capital, rtol=1e-12)
+	pd.testing.assert_frame_equal(depot.portfolio, expected.portfolio)
+	pd.testing.assert_frame_equal(depot.transactions(),
+								expected.transactions())
+
+
+def test_buy_and_sell_update_capital_portfolio_and_ledger():
+	depot = dp.Depot(capital=1000.0, fees=5.0)
+	depot.time = pd.Timestamp('2014-01-02')
+	# Maximum amount, then 10 more at a higher price
+	depot.buy('A', 20.0)
+	depot.buy('B', 1.0, 10)
+	assert depot.capital == 1000.0 - 49 * 20.0 - 5.0 - 10.0 - 5.0
+	assert depot.portfolio.loc['A', 'Quantity'] == 49
+	# Selling more than owned sells all, taxes only on the gain
+	depot.sell('A', 30.0, 100)
+	taxes = dp.TAX * 10.0 * 49
+	assert np.isclose(depot.capital, 49 * 30.0 - 5.0 - taxes)
+	assert list(depot.portfolio.index) == ['B']
+	# Selling stocks not owned does nothing
+	depot.sell('C', 1.0)
+	transactions = depot.transactions()
+	assert list(transactions['Symbol']) == ['A', 'B', 'A']
+	assert list(transactions['Side']) == [dp.BUY, dp.BUY, dp.SELL]
+	assert np.isclose(transactions['Tax'].sum(), taxes)
+
+
+def test_buy_many_matches_buy():
+	depot = dp.Depot(capital=1000.0, fees=5.0)
+	depot.buy_many(STOCKS, PRICES, QUANTS)
+	assert_same(depot, sequential(STOCKS, PRICES, QUANTS))
+
+
+def test_sell_many_matches_sell():
+	depot = sequential(STOCKS, PRICES, QUANTS)
+	expected = sequential(STOCKS, PRICES, QUANTS)
+	sell = ['C', 'A', 'E']
+	prices = np.array([3.0, 12.0, 1.0])
+	quants = np.array([50.0, np.nan, 10.0])
+	depot.sell_many(sell, prices, quants)
+	for stock, price, quant in zip(sell, prices, quants):
+		expected.sell(stock, price, None if np.isnan(quant) else quant)
+	assert_same(depot, expected)
+
+
+def test_depot_array_matches_depots():
+	capital = np.array([100.0, 1000.0, 5000.0])
+	depots = dp.DepotArray(capital, fees=5.0)
+	depots.buy_many(STOCKS, PRICES, QUANTS)
+	depots.sell('A', 12.0)
+	for account, start in enumerate(capital):
+		depot = dp.Depot(capital=start, fees=5.0)
+		depot.buy_many(STOCKS, PRICES, QUANTS)
+		depot.sell('A', 12.0)
+		assert np.isclose(depots.capital[account], depot.capital, rtol=1e-12)
@@ -0,0 +1,67 @@
+# External imports
+import numpy as np
+import pandas as pd
+# Local imports
+import features as ft
+
+#===============================================================================
+# Groupby helpers of the former FinanceData.enrich_data, as reference
+#===============================================================================
+
+def within_day(data, rel):
+	denominator = data['Close'] if rel else 1.0
+	return (data['Close'] - data['Open']) / denominator
+
+
+def between_day(data, rel):
+	denominator = data['Close'] if rel else 1.0
+	return (data['Open'].shift(1) - data['Close']) / denominator
+
+
+def previous_day(data, rel, i):
+	return between_day(data, rel).shift(-i)
+
+
+def reference(data, name):
+	'''
+	Computes feature name per stock with the groupby helpers.
+	'''
+	rel = '_Rel' in name
+	if name.startswith('Within_Day'):
+		helper = lambda x: within_day(x, rel)
+	elif name.startswith('Between_Day'):
+		helper = lambda x: between_day(x, rel)
+	else:
+		i = int(name.rsplit('_', 1)[1])
+		helper = lambda x: previous_day(x, rel, i)
+	return data.groupby(level='Symbol', group_keys=False).apply(helper)
+
+#===============================================================================
+# Tests
+#===============================================================================
+
+def test_features_match_groupby_helpers(finance):
+	finance.enrich_data()
+	prices = finance.data[['Open', 'High', 'Low', 'Close']]
+	for name in ft.FEATURES:
+		expected = reference(prices, name).reindex(finance.data.index)
+		np.testing.assert_allclose(finance.data[name].values, expected.values,
+									rtol=1e-12, equal_nan=True, err_msg=name)
+
+
+def test_lazy_features_match_enrich(finance):
+	column = finance['Previous_Day_Rel_2'].copy()
+	finance.invalidate()
+	finance.enrich_data()
+	pd.testing.assert_series_equal(finance.data['Previous_Day_Rel_2'], column)
+
+
+def test_eviction_keeps_requested_features(finance):
+	finance.max_features = 1
+	finance.require(['Within_Day'])
+	finance.require(['Within_Day', 'Between_Day'])
+	assert list(finance.features) == ['Within_Day', 'Between_Day']
+	# Least recently used features are dropped once no longer requested
+	finance.require(['Previous_Day_1'])
+	assert list(finance.features) == ['Previous_Day_1']
+	assert 'Within_Day' not in finance.data
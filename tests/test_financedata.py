@@ -0,0 +1,13 @@
+# External imports
+import pandas as pd
+# Local imports
+from conftest import synthetic
+
+
+def test_extend_matches_full_load():
+	full = synthetic(missing=0.05, gaps=0.8)
+	full.enrich_data()
+	part = synthetic(end_date='2013-06-30', missing=0.05, gaps=0.8)
+	part.enrich_data()
+	part.extend(full.end_date)
+	pd.testing.assert_frame_equal(part.data, full.data[part.data.columns])
@@ -0,0 +1,38 @@
+# External imports
+import numpy as np
+import pandas as pd
+# Local imports
+import backtest as bt
+import depot as dp
+import montecarlo as mc
+import strategies as strat
+
+
+def test_paths_do_not_depend_on_number_of_paths(finance):
+	few = mc.MonteCarloSimulator(finance, dp.Depot(1000.0, 5.0),
+								strat.inter_day_random_paths, n_paths=5)
+	many = mc.MonteCarloSimulator(finance, dp.Depot(1000.0, 5.0),
+								strat.inter_day_random_paths, n_paths=20)
+	result = few.run()
+	assert result.shape == (5, 3)
+	pd.testing.assert_frame_equal(result, many.run().iloc[:5])
+
+
+def test_path_matches_vector_simulator(finance):
+	simulator = mc.MonteCarloSimulator(finance, dp.Depot(1000.0, 5.0),
+									strat.inter_day_random_paths, n_paths=3)
+	result = simulator.run()
+	chosen = strat.inter_day_random_paths(simulator.prices,
+										simulator.uniforms())
+	close = simulator.prices['Close']
+	for path in range(3):
+		# All money into the stock chosen by the path
+		weights = np.zeros(close.shape)
+		weights[np.arange(len(close)), chosen[:, path]] = 1.0
+		weights = pd.DataFrame(weights, index=close.index,
+							columns=close.columns)
+		capital = bt.VectorSimulator(finance, dp.Depot(1000.0, 5.0),
+									lambda prices, **kwargs: weights)\
+					.run()['capital']
+		np.testing.assert_allclose(simulator.capital[path], capital.values)
+		assert np.isclose(result['capital'][path], capital.iloc[-1])
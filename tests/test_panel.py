@@ -0,0 +1,31 @@
+# External imports
+import pandas as pd
+import pytest
+# Local imports
+import financedata as fd
+import panel as pn
+
+
+def test_panel_round_trip(finance, tmp_path):
+	path = str(tmp_path / 'panel')
+	finance.save_panel(path)
+	loaded = fd.FinanceData.from_panel(path)
+	# Values are stored as float32
+	pd.testing.assert_frame_equal(loaded.data,
+								finance.data[loaded.data.columns],
+								check_exact=False, rtol=1e-6)
+
+
+def test_panel_loads_parts(finance, tmp_path):
+	path = str(tmp_path / 'panel')
+	finance.save_panel(path)
+	symbols = list(finance.name_list[2:4])
+	part = fd.FinanceData.from_panel(path, symbols, '2012-06-01', '2012-12-31')
+	# Rows of the stocks within the range
+	expected = finance.data.loc[symbols][part.data.columns]
+	dates = expected.index.get_level_values('Date')
+	expected = expected[(dates >= '2012-06-01') & (dates <= '2012-12-31')]
+	pd.testing.assert_frame_equal(part.data, expected, check_exact=False,
+								rtol=1e-6)
+	with pytest.raises(KeyError):
+		pn.Panel(path).to_frame(symbols=['XXX'])
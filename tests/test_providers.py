@@ -0,0 +1,12 @@
+# External imports
+import pandas as pd
+# Local imports
+import providers as pv
+
+
+def test_synthetic_history_does_not_depend_on_range():
+	provider = pv.SyntheticProvider(seed=3, missing=0.1, gaps=1.0)
+	short = provider.get_history('ADS.DE', '2014-01-01', '2014-02-01')
+	long = provider.get_history('ADS.DE', '2013-06-01', '2014-03-01')
+	long = long[long['Date'].isin(short['Date'])].reset_index(drop=True)
+	pd.testing.assert_frame_equal(short, long)
@@ -0,0 +1,82 @@
+# External imports
+import numpy as np
+import pandas as pd
+# Local imports
+import backtest as bt
+import depot as dp
+import market as mk
+import simulator as sim
+import strategies as strat
+import universe as un
+from conftest import synthetic
+
+# Event driven strategies, their weight matrix versions and arguments
+PAIRS = [(strat.inter_day_even, strat.inter_day_even_weights, {}),
+		(strat.inter_day_greedy, strat.inter_day_greedy_weights, {'t_len': 4})]
+
+
+def test_vector_simulator_matches_simulator(finance):
+	for event, vector, kwargs in PAIRS:
+		capital = sim.Simulator(finance, dp.Depot(10000.0, 5.0), event)\
+					.run(**kwargs)['capital']
+		weights = bt.VectorSimulator(finance, dp.Depot(10000.0, 5.0), vector)\
+					.run(**kwargs)['capital']
+		np.testing.assert_allclose(capital.values.astype('float64'),
+									weights.values, rtol=1e-9)
+
+
+def without_volume(finance):
+	# Same data with zero volumes on a tenth of the rows
+	data = finance.data.copy()
+	data.loc[np.random.RandomState(0).random_sample(len(data)) < 0.1,
+			'Volume'] = 0.0
+	return type(finance)(finance.name_list, start_date=finance.start_date,
+						end_date=finance.end_date, data=data)
+
+
+def test_strategies_skip_stocks_without_volume(finance):
+	# Zero volume days are not tradable in both versions
+	test_vector_simulator_matches_simulator(without_volume(finance))
+
+
+def test_market_traded_matches_universe(finance):
+	finance = without_volume(finance)
+	universe = finance.universe()
+	market = mk.MarketContext.from_prices(finance.matrices())
+	pushed = mk.MarketContext(universe.symbols)
+	for time, day in finance.data.groupby(level='Date'):
+		expected = universe.mask(time, ('traded',))
+		market.seek(time)
+		pushed.push(time, day.index.get_level_values('Symbol'),
+					day['Open'].values, day['Close'].values,
+					un.rows_traded(day))
+		for stock, traded in zip(universe.symbols, expected):
+			assert market.traded(stock) == traded
+			assert pushed.traded(stock) == traded
+
+
+def test_multi_simulator_matches_simulators(finance):
+	runs = {'even': (strat.inter_day_even, dp.Depot(10000.0, 5.0)),
+			'greedy': (strat.inter_day_greedy, dp.Depot(10000.0, 5.0),
+						{'t_len': 4})}
+	result = sim.MultiSimulator(finance, runs).run()
+	for name, run in runs.items():
+		kwargs = run[2] if len(run) > 2 else {}
+		capital = sim.Simulator(finance, dp.Depot(10000.0, 5.0), run[0])\
+					.run(**kwargs)['capital']
+		np.testing.assert_allclose(result[name].values.astype('float64'),
+									capital.values.astype('float64'))
+
+
+def test_resume_matches_full_run(tmp_path):
+	checkpoint = str(tmp_path / 'greedy.ckpt')
+	full = synthetic()
+	expected = sim.Simulator(full, dp.Depot(10000.0, 5.0),
+							strat.inter_day_greedy).run(t_len=4)
+	part = synthetic(end_date='2013-06-30')
+	sim.Simulator(part, dp.Depot(10000.0, 5.0), strat.inter_day_greedy,
+				checkpoint=checkpoint).run(t_len=4)
+	part.extend(full.end_date)
+	resumed = sim.Simulator.resume(part, checkpoint).run(t_len=4)
+	pd.testing.assert_frame_equal(resumed.astype('float64'),
+								expected.astype('float64'))
@@ -0,0 +1,85 @@
+# External imports
+import numpy as np
+import pandas as pd
+import pytest
+# Local imports
+import stats
+
+
+def observations(seed, days=40, symbols=('A', 'B', 'C')):
+	# Random values with some missing observations
+	random = np.random.RandomState(seed)
+	values = random.normal(size=(days, len(symbols)))
+	values[random.random_sample(values.shape) < 0.1] = np.nan
+	return pd.DataFrame(values, columns=list(symbols))
+
+
+def test_rolling_stats_match_pandas():
+	values = observations(0)
+	for window in (None, 5):
+		rolling = stats.RollingStats(values.columns, window=window)
+		for _, day in values.iterrows():
+			rolling.update(values.columns, day.values)
+		last = values if window is None else values.iloc[-window:]
+		pd.testing.assert_series_equal(rolling.mean(), last.mean(),
+										check_names=False)
+		pd.testing.assert_series_equal(rolling.hit_rate(),
+										(last > 0).mean(), check_names=False)
+
+
+def test_rolling_stats_add_stocks():
+	values = observations(1)
+	rolling = stats.RollingStats(['A', 'B'], window=5)
+	with pytest.raises(KeyError):
+		rolling.update(['A', 'C'], [1.0, 1.0])
+	# A stock listed later starts without observations
+	rolling.update(['A', 'B'], values.iloc[0, :2].values)
+	rolling.add(['B', 'C'])
+	for _, day in values.iloc[1:].iterrows():
+		rolling.update(values.columns, day.values)
+	assert list(rolling.symbols) == ['A', 'B', 'C']
+	assert np.isclose(rolling.mean()['C'], values['C'].iloc[-5:].mean())
+	assert rolling.count.tolist() == [5, 5, 5]
+
+
+def least_squares(x, y):
+	# Reference regression with a constant on the complete observations
+	valid = np.isfinite(y) & np.isfinite(x).all(axis=1)
+	design = np.hstack([np.ones((valid.sum(), 1)), x[valid]])
+	return np.linalg.lstsq(design, y[valid], rcond=None)[0]
+
+
+def test_rolling_ols_matches_least_squares():
+	random = np.random.RandomState(2)
+	x = random.normal(size=(30, 2, 2))
+	y = x @ [1.0, -2.0] + random.normal(size=(30, 2))
+	y[random.random_sample(y.shape) < 0.1] = np.nan
+	for window in (None, 10):
+		ols = stats.RollingOLS(['A', 'B'], 2, window=window)
+		for i in range(len(y)):
+			ols.update(['A', 'B'], x[i], y[i])
+		for j, stock in enumerate(['A', 'B']):
+			# The window counts the complete observations of the stock
+			valid = np.flatnonzero(np.isfinite(y[:, j]))
+			if window is not None:
+				valid = valid[-window:]
+			np.testing.assert_allclose(ols.coef([stock])[0],
+							least_squares(x[valid, j], y[valid, j]))
+	with pytest.raises(KeyError):
+		ols.coef(['C'])
+	ols.add(['C'])
+	assert np.isnan(ols.coef(['C'])).all()
+
+
+def test_next_day_predictions_use_previous_days():
+	regressor = observations(3, days=20).fillna(0.0)
+	target = observations(4, days=20).fillna(0.0)
+	predictions = stats.next_day_predictions([regressor], target)
+	# Target of the last day predicted from the regressors of the day before,
+	# fitted on the pairs of all earlier days
+	for stock in target.columns:
+		x = regressor[stock].values
+		y = target[stock].values
+		coef = least_squares(x[:-2, None], y[1:-1])
+		assert np.isclose(predictions[stock].iloc[-1],
+						coef[0] + coef[1] * x[-2])
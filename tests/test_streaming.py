@@ -0,0 +1,42 @@
+# External imports
+import numpy as np
+import pandas as pd
+# Local imports
+import depot as dp
+import strategies as strat
+import streaming as st
+from conftest import synthetic
+
+
+def with_late_listing(finance, start_date):
+	# Stock listed at start_date opening above every previous close
+	dates = pd.bdate_range(start_date, finance.end_date, name='Date')
+	late = pd.DataFrame({'Open': 101.0, 'High': 102.0, 'Low': 99.0,
+						'Close': 100.0, 'Volume': 1000.0, 'Adj_Close': 100.0},
+						index=pd.MultiIndex.from_product([['AAA'], dates],
+												names=['Symbol', 'Date']))
+	return pd.concat([finance.data, late[finance.data.columns]])
+
+
+def test_stream_trades_late_listings():
+	data = with_late_listing(synthetic('2012-01-02', '2012-04-30', symbols=3),
+							'2012-03-01')
+	depot = dp.Depot(1000.0, 5.0)
+	st.StreamSimulator(st.frame_bars(data), depot, strat.inter_day_greedy,
+						lookback=10).run(t_len=4)
+	assert 'AAA' in set(depot.transactions()['Symbol'])
+
+
+def test_stream_records_capital():
+	finance = synthetic('2012-01-02', '2012-04-30', symbols=3)
+	dates = np.unique(finance.data.index.get_level_values('Date'))
+	recorded = st.StreamSimulator(st.frame_bars(finance.data),
+								dp.Depot(1000.0, 5.0), strat.inter_day_even,
+								record=True).run()
+	last = st.StreamSimulator(st.frame_bars(finance.data),
+							dp.Depot(1000.0, 5.0), strat.inter_day_even).run()
+	assert list(recorded.index) == list(dates)
+	pd.testing.assert_frame_equal(last, recorded.iloc[-1:])
+	empty = st.StreamSimulator(iter([]), dp.Depot(1000.0, 5.0),
+								strat.inter_day_even).run()
+	assert empty.empty
@@ -0,0 +1,42 @@
+# External imports
+import numpy as np
+# Local imports
+import depot as dp
+import simulator as sim
+import strategies as strat
+import sweep as sw
+
+
+def test_sweep_matches_simulator(finance):
+	configs = sw.grid(strategy=[strat.inter_day_greedy], t_len=[2, 4],
+					fees=[5.0])
+	results = sw.sweep(finance, configs, max_workers=2)
+	for t_len, capital in results.groupby('t_len')['Capital']:
+		expected = sim.Simulator(finance, dp.Depot(1000.0, 5.0),
+								strat.inter_day_greedy).run(t_len=t_len)
+		expected = expected['capital'].values.astype('float64')
+		np.testing.assert_allclose(capital.values.astype('float64'), expected)
+
+
+def test_attached_panel_is_not_copied(finance):
+	panel = sw.SharedPanel(finance)
+	try:
+		attached, blocks = sw.SharedPanel.attach(panel.spec)
+		shared = [np.ndarray(shape, dtype, block.buf)
+					for block, (_, shape, dtype)
+					in zip(blocks, panel.spec['arrays'].values())]
+		simulator = sim.Simulator(attached, dp.Depot(1000.0, 5.0),
+								strat.inter_day_even)
+		# The view and the price matrices read by the simulator are slices
+		assert np.shares_memory(simulator.view.data.values, shared[0])
+		for name in sw.MATRICES:
+			assert any(np.shares_memory(simulator.market.matrices[name], array)
+						for array in shared)
+		window = sw.since(attached, finance.data.index
+						.get_level_values('Date').sort_values()[100])
+		assert np.shares_memory(window.view().data.values, shared[0])
+		del simulator, window, attached, shared
+	finally:
+		for block in blocks:
+			block.close()
+		panel.close()
@@ -0,0 +1,42 @@
+# External imports
+import numpy as np
+import pandas as pd
+# Local imports
+import backtest as bt
+import depot as dp
+import simulator as sim
+import strategies as strat
+
+
+def test_tradable_matches_rows(finance):
+	universe = finance.universe()
+	for time, day in list(finance.data.groupby(level='Date'))[::50]:
+		traded = day[np.isfinite(day['Open']) & np.isfinite(day['Close'])
+					& (day['Volume'] > 0)]
+		assert list(universe.tradable(time)) == \
+				list(traded.index.get_level_values('Symbol'))
+
+
+def test_memberships_restrict_tradable_stocks(finance):
+	symbols = list(finance.name_list)
+	finance.universe().add_membership('IDX', symbols[0], end='2012-12-31')
+	finance.universe().add_membership('IDX', symbols[1], start='2013-01-01')
+	universe = finance.universe()
+	for time in universe.calendar[::50]:
+		member = symbols[0] if time <= pd.Timestamp('2012-12-31') \
+				else symbols[1]
+		assert set(universe.tradable(time, 'IDX')) <= {member}
+	# The greedy strategies only buy members of the index
+	depot = dp.Depot(10000.0, 5.0)
+	capital = sim.Simulator(finance, depot, strat.inter_day_greedy)\
+				.run(t_len=4, index='IDX')['capital']
+	bought = depot.transactions()
+	assert len(bought)
+	first = bought['Time'] <= pd.Timestamp('2012-12-31')
+	assert set(bought['Symbol'][first]) <= {symbols[0]}
+	assert set(bought['Symbol'][~first]) <= {symbols[1]}
+	weights = bt.VectorSimulator(finance, dp.Depot(10000.0, 5.0),
+								strat.inter_day_greedy_weights)\
+				.run(t_len=4, index='IDX')['capital']
+	np.testing.assert_allclose(capital.values.astype('float64'),
+								weights.values, rtol=1e-9)
@@ -0,0 +1,55 @@
+# External imports
+import numpy as np
+import pandas as pd
+import pytest
+# Local imports
+import depot as dp
+import simulator as sim
+import strategies as strat
+import walkforward as wf
+
+
+def test_windows_split_dates():
+	dates = pd.bdate_range('2014-01-01', periods=10)
+	rolling = wf.windows(dates, train=4, test=3)
+	assert [window['test_start'] for window in rolling] == \
+			[dates[4], dates[7]]
+	assert rolling[1]['train_start'] == dates[3]
+	assert rolling[1]['test_end'] == dates[9]
+	expanding = wf.windows(dates, train=4, test=3, step=2, expanding=True)
+	assert all(window['train_start'] == dates[0] for window in expanding)
+	assert len(expanding) == 3
+
+
+def test_walk_forward_matches_simulator(finance):
+	config = {'strategy': strat.inter_day_greedy, 't_len': 4}
+	results = wf.walk_forward(finance, config, train=120, test=60,
+							max_workers=2)
+	for _, window in results.iterrows():
+		# The strategy only sees the data of the window
+		data = finance.data[finance.data.index.get_level_values('Date')
+							>= window['train_start']]
+		window_data = type(finance)(finance.name_list, data=data,
+									start_date=window['train_start'],
+									end_date=window['test_end'])
+		depot = dp.Depot(1000.0, 5.0)
+		expected = sim.Simulator(window_data, depot, strat.inter_day_greedy,
+								start_time=window['test_start'],
+								end_time=window['test_end']).run(t_len=4)
+		assert np.isclose(window['capital'], expected['capital'].iloc[-1])
+		assert window['trades'] == len(depot.ledger)
+
+
+def test_walk_forward_honors_engine(finance):
+	event = wf.walk_forward(finance, {'strategy': strat.inter_day_even},
+							train=120, test=60, max_workers=2)
+	vector = wf.walk_forward(finance,
+							{'strategy': strat.inter_day_even_weights,
+							'engine': 'vector'},
+							train=120, test=60, max_workers=2)
+	np.testing.assert_allclose(vector['capital'], event['capital'])
+	assert vector['trades'].isnull().all()
+	with pytest.raises(ValueError):
+		wf.walk_forward(finance, {'strategy': strat.inter_day_even,
+								'start_time': finance.start_date},
+						train=120, test=60)